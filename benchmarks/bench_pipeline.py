@@ -0,0 +1,283 @@
+"""Micro-benchmarks for the text2speech synthesis pipeline.
+
+Runs offline against stub engines, nothing is synthesized by a real TTS.
+Benchmarks needing the sox binary are skipped when it is not installed.
+
+Usage:
+    python benchmarks/bench_pipeline.py -o results.json
+    python benchmarks/bench_pipeline.py -o new.json --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from os.path import dirname, join
+
+sys.path.insert(0, dirname(dirname(os.path.abspath(__file__))))
+
+from text2speech.modules import TTS, TTSValidator, ConcatTTS, TTSMutator, \
+    EffectChain
+from text2speech.modules.mimic2_tts import sentence_chunker
+
+BENCHMARKS = {}
+
+SHORT_TEXT = "Hello world, this is a short sentence spoken by the assistant."
+BOOK_TEXT = " ".join(
+    ["It was the best of times, it was the worst of times; it was the age "
+     "of wisdom, it was the age of foolishness - it was the epoch of "
+     "belief. It was the season of Light! Was it the season of Darkness?"]
+    * 400)
+SSML_TEXT = ('<speak>Hello <prosody rate="slow">world</prosody>, '
+             '<unsupported attr="1">this</unsupported> is a '
+             '<break time="3s"/><emphasis>test</emphasis> of '
+             '<say-as interpret-as="digits">123</say-as></speak>') * 10
+PHONEMES = " ".join("{}:{:.3f}".format(p, 0.05 * i) for i, p in
+                    enumerate(["HH", "AH", "L", "OW", "W", "ER", "L", "D",
+                               "DH", "IH", "S", "IH", "Z", "AH", "T", "EH",
+                               "S", "T"] * 10))
+EFFECTS = {"pitch": {"n_semitones": 2},
+           "tempo": {"factor": 1.2},
+           "echo": {"delays": [60], "decays": [0.4]},
+           "bass": {"gain_db": 3},
+           "highpass": {"frequency": 80},
+           "gain": {"gain_db": -1}}
+
+
+def write_wav(path, seconds=0.5, rate=16000):
+    n = int(seconds * rate)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack("<%dh" % n,
+                                  *((i * 37) % 2000 - 1000
+                                    for i in range(n))))
+    return path
+
+
+class StubTTS(TTS):
+    """Engine writing a fixed wav, used to time everything around get_tts."""
+
+    def __init__(self, config=None):
+        super(StubTTS, self).__init__(config, StubValidator(self),
+                                      ssml_tags=["speak", "prosody", "break",
+                                                 "emphasis", "say-as"])
+
+    def load_spellings(self, config=None):
+        # the default implementation reads the mycroft config
+        return {}
+
+    def get_tts(self, sentence, wav_file):
+        write_wav(wav_file, 0.05)
+        return wav_file, PHONEMES
+
+
+class StubConcatTTS(ConcatTTS):
+    def load_spellings(self, config=None):
+        return {}
+
+
+class StubValidator(TTSValidator):
+    def validate_lang(self):
+        pass
+
+    def validate_connection(self):
+        pass
+
+    def get_tts_class(self):
+        return StubTTS
+
+
+def benchmark(name, number=1000, requires=None):
+    def decorator(func):
+        BENCHMARKS[name] = (func, number, requires)
+        return func
+    return decorator
+
+
+def make_tts(**config):
+    config.setdefault("lang", "en-us")
+    config.setdefault("voice", "stub")
+    config.setdefault("cache", {"directory": tempfile.mkdtemp()})
+    tts = StubTTS(config)
+    return tts
+
+
+@benchmark("execute_hit", number=2000)
+def bench_execute_hit():
+    tts = make_tts()
+    tts._execute(SHORT_TEXT)
+
+    def run():
+        tts._execute(SHORT_TEXT)
+        tts.queue.get()
+    return run
+
+
+@benchmark("execute_miss", number=300)
+def bench_execute_miss():
+    tts = make_tts()
+    counter = iter(range(10 ** 9))
+
+    def run():
+        tts._execute("{} {}".format(SHORT_TEXT, next(counter)))
+        tts.queue.get()
+    return run
+
+
+@benchmark("validate_ssml", number=2000)
+def bench_validate_ssml():
+    tts = make_tts()
+    return lambda: tts.validate_ssml(SSML_TEXT)
+
+
+@benchmark("phonetic_spelling", number=200)
+def bench_phonetic_spelling():
+    tts = make_tts()
+    tts.spellings = {"word{}".format(i): "w {}".format(i)
+                     for i in range(5000)}
+    tts.spellings.update({"times": "tymes", "wisdom": "wiz dum",
+                          "season": "see zon"})
+    return lambda: tts.spellings.apply(BOOK_TEXT)
+
+
+@benchmark("sentence_chunker_short", number=20000)
+def bench_chunker_short():
+    return lambda: sentence_chunker(SHORT_TEXT, 10)
+
+
+@benchmark("sentence_chunker_book", number=100)
+def bench_chunker_book():
+    return lambda: sentence_chunker(BOOK_TEXT, 10)
+
+
+@benchmark("mutator_build", number=5000)
+def bench_mutator_build():
+    def run():
+        TTSMutator("bench.wav", EFFECTS).apply(save=False)
+    return run
+
+
+@benchmark("effect_chain", number=5000)
+def bench_effect_chain():
+    chain = EffectChain(EFFECTS)
+    return lambda: chain.sox_command("bench.wav")
+
+
+@benchmark("mutator_execute", number=20, requires="sox")
+def bench_mutator_execute():
+    wav_file = write_wav(join(tempfile.mkdtemp(), "bench.wav"))
+    return lambda: TTSMutator(wav_file, EFFECTS).apply()
+
+
+@benchmark("concat", number=2000)
+def bench_concat():
+    directory = tempfile.mkdtemp()
+    units = [write_wav(join(directory, "{}.wav".format(i)), 0.2, 22050)
+             for i in range(10)]
+    tts = StubConcatTTS({"lang": "en-us", "sounds": directory,
+                         "cache": {"directory": directory}})
+    out = join(directory, "out.wav")
+    return lambda: tts.concat(units, out)
+
+
+@benchmark("viseme", number=5000)
+def bench_viseme():
+    tts = make_tts()
+    return lambda: tts.viseme(PHONEMES)
+
+
+def run_benchmark(func, number, repeat):
+    run = func()
+    run()  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number * 1e6)
+    timings.sort()
+    return {"number": number,
+            "repeat": repeat,
+            "min_us": timings[0],
+            "median_us": timings[len(timings) // 2],
+            "max_us": timings[-1]}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=dirname(__file__),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline, return names of regressions."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        old = baseline.get(name)
+        if not old:
+            print("{:<24} {:>12.2f}us   (new)".format(name,
+                                                      result["min_us"]))
+            continue
+        ratio = result["min_us"] / old["min_us"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print("{:<24} {:>12.2f}us {:>7.2f}x{}".format(
+            name, result["min_us"], ratio, flag))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-o", "--output", help="write results to json file")
+    parser.add_argument("-c", "--compare",
+                        help="json results of a previous run to compare to")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-t", "--threshold", type=float, default=1.2,
+                        help="slowdown ratio reported as a regression")
+    parser.add_argument("-k", "--filter", default="",
+                        help="only run benchmarks containing this string")
+    args = parser.parse_args(args)
+
+    results = {}
+    for name, (func, number, requires) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        if requires and not shutil.which(requires):
+            print("{:<24} skipped, {} not installed".format(name, requires))
+            continue
+        results[name] = run_benchmark(func, number, args.repeat)
+        print("{:<24} {:>12.2f}us".format(name, results[name]["min_us"]))
+
+    report = {"revision": git_revision(),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "time": time.time(),
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print()
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
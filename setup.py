@@ -60,7 +60,12 @@ setup(
                       "gTTS>=2.2.1",
                       "pyee==8.1.0",
                       "voxpopuli"],
+    extras_require={"async": ["aiohttp"],
+                    "dsp": ["numpy", "scipy"]},
     author_email='jarbasai@mailfence.com',
     description='TTS engines',
-    entry_points={'mycroft.plugin.tts': PLUGIN_ENTRY_POINT}
+    entry_points={'mycroft.plugin.tts': PLUGIN_ENTRY_POINT,
+                  'console_scripts': [
+                      'text2speech-prewarm = text2speech.prewarm:main'
+                  ]}
 )
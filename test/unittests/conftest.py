@@ -0,0 +1,120 @@
+import struct
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from text2speech.modules import TTS, TTSValidator
+
+
+def write_wav(path, frames=1600, rate=16000):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack("<%dh" % frames,
+                                  *([1000, -1000] * (frames // 2))))
+
+
+class StubTTS(TTS):
+    """Local engine writing a short wav, counting its syntheses."""
+
+    def __init__(self, config):
+        super().__init__(config, StubValidator(self))
+        self.calls = 0
+
+    def load_spellings(self, config=None):
+        # the default resolves a mycroft resource file
+        return {}
+
+    def get_tts(self, sentence, wav_file):
+        self.calls += 1
+        write_wav(wav_file)
+        return wav_file, "HH:0.1 EH:0.2"
+
+
+class StubValidator(TTSValidator):
+    def validate_lang(self):
+        pass
+
+    def validate_connection(self):
+        pass
+
+    def get_tts_class(self):
+        return StubTTS
+
+
+@pytest.fixture
+def make_tts(tmp_path):
+    """Return a factory of StubTTS engines caching under tmp_path."""
+    engines = []
+
+    def make(clazz=StubTTS, **config):
+        config.setdefault("lang", "en-us")
+        config.setdefault("voice", "v")
+        cache = config.setdefault("cache", {})
+        cache.setdefault("directory",
+                         str(tmp_path / "cache{}".format(len(engines))))
+        engine = clazz(config)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.stop()
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.hits = 0
+        self.delay = 0
+        self.status = 200
+        self.body = b"ok"
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _reply(self):
+        self.server.hits += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        time.sleep(self.server.delay)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def make_server():
+    """Return a factory of local HTTP servers, shut down afterwards."""
+    servers = []
+
+    def make():
+        server = Server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def server(make_server):
+    return make_server()
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+
+def test_aiohttp_session_closed_when_replaced(make_tts):
+    tts = make_tts()
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(tts.get_aiohttp_session())
+        second = asyncio.run(tts.get_aiohttp_session())
+        assert second is not first
+        # closed as soon as its loop runs again
+        loop.run_until_complete(asyncio.sleep(0))
+        assert first.closed
+        # the loop of the second session is closed by now
+        third = loop.run_until_complete(tts.get_aiohttp_session())
+        assert second.closed and not third.closed
+    finally:
+        tts.stop()
+        loop.close()
+    assert third.closed
+
+
+def test_aiohttp_session_closed_on_stop(make_tts):
+    tts = make_tts()
+    loop = asyncio.new_event_loop()
+    session = loop.run_until_complete(tts.get_aiohttp_session())
+    tts.stop()
+    loop.close()
+    assert session.closed
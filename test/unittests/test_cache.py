@@ -0,0 +1,54 @@
+import os
+
+from text2speech.cache import TTSCache
+from conftest import write_wav
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    path = cache.path_for("key", "wav")
+    write_wav(path)
+    assert cache.put("key", path, audio_ext="wav") is not None
+    os.remove(path)
+    assert cache.get("key") is None
+    assert "key" not in cache
+
+
+def test_missing_file_is_synthesized_again(make_tts):
+    tts = make_tts()
+    wav_file, _ = tts.synthesize("hello")
+    os.remove(wav_file)
+    wav_file, _ = tts.synthesize("hello")
+    assert os.path.isfile(wav_file)
+    assert tts.calls == 2
+
+
+def test_missing_file_behind_memory_tier(tmp_path):
+    cache = TTSCache(str(tmp_path), memory_bytes=1024 * 1024)
+    path = cache.path_for("key", "wav")
+    write_wav(path)
+    cache.put("key", path, audio_ext="wav")
+    assert cache.get("key") is not None
+    os.remove(path)
+    assert cache.get("key") is None
+    assert "key" not in cache
+
+
+def test_one_miss_per_lookup(make_tts):
+    tts = make_tts()
+    for _ in range(3):
+        tts.synthesize("hello")
+    stats = tts.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_stream_served_from_memory_tier(make_tts):
+    tts = make_tts(cache={"memory_bytes": 1024 * 1024})
+    first = b"".join(tts.synthesize_stream("hello"))
+    # the first cache hit reads the file and promotes it
+    assert b"".join(tts.synthesize_stream("hello")) == first
+    wav_file, _ = tts.synthesize("hello")
+    os.remove(wav_file)
+    assert b"".join(tts.synthesize_stream("hello")) == first
+    # the synthesize lookup and the last stream
+    assert tts.cache_stats()["memory"]["hits"] == 2
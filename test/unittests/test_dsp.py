@@ -0,0 +1,95 @@
+import io
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from text2speech import dsp
+from text2speech.modules import EffectChain
+
+RATE = 16000
+
+
+def response(effect, frequencies, **params):
+    """Return the gain in dB of an effect's filter at frequencies."""
+    coefficients = []
+
+    def capture(b, a, x):
+        coefficients.append((b, a))
+        return x
+
+    mp = pytest.MonkeyPatch()
+    mp.setattr(dsp, "lfilter", capture)
+    try:
+        effect(np.zeros((1, 1), dtype=np.float32), RATE, **params)
+    finally:
+        mp.undo()
+    (b, a), = coefficients
+    z = np.exp(-2j * np.pi * np.asarray(frequencies) / RATE)
+    h = np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    return 20 * np.log10(np.abs(h))
+
+
+def test_highpass_response():
+    dc, cutoff, nyquist = response(dsp.highpass, [1, 1000, RATE / 2],
+                                   frequency=1000)
+    assert dc < -60
+    assert cutoff == pytest.approx(-3.01, abs=0.05)
+    assert nyquist == pytest.approx(0, abs=0.01)
+
+
+def test_equalizer_response():
+    dc, center, nyquist = response(dsp.equalizer, [0, 1000, RATE / 2],
+                                   frequency=1000, width_q=1, gain_db=6)
+    assert center == pytest.approx(6, abs=0.01)
+    assert dc == pytest.approx(0, abs=0.01)
+    assert nyquist == pytest.approx(0, abs=0.01)
+
+
+@pytest.mark.parametrize("effect,boosted,flat", [
+    (dsp.bass, 0, RATE / 2),
+    (dsp.treble, RATE / 2, 0)])
+def test_shelf_response(effect, boosted, flat):
+    boost, corner, rest = response(effect, [boosted, 1000, flat],
+                                   gain_db=6, frequency=1000)
+    assert boost == pytest.approx(6, abs=0.01)
+    # the corner frequency gets half the gain
+    assert corner == pytest.approx(3, abs=0.01)
+    assert rest == pytest.approx(0, abs=0.01)
+
+
+def test_lfilter_recurrence_matches_response(monkeypatch):
+    # the pure python fallback, used without scipy
+    monkeypatch.setattr(dsp, "_lfilter", None)
+    t = np.arange(RATE, dtype=np.float32) / RATE
+    sine = np.sin(2 * np.pi * 1000 * t)[:, None]
+    out = dsp.highpass(sine, RATE, frequency=1000)
+    steady = out[RATE // 2:]
+    gain_db = 20 * np.log10(np.sqrt(2 * np.mean(steady ** 2)))
+    assert gain_db == pytest.approx(-3.01, abs=0.05)
+
+
+def test_filters_need_scipy(monkeypatch):
+    monkeypatch.setattr(dsp, "_lfilter", None)
+    assert not dsp.supports({"highpass": {"frequency": 100}})
+    assert dsp.supports({"gain": {"gain_db": -3}})
+
+
+def test_unsupported_width_falls_back_to_sox(monkeypatch):
+    audio = io.BytesIO()
+    with wave.open(audio, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(3)
+        f.setframerate(RATE)
+        f.writeframes(b"\0" * 300)
+    with pytest.raises(dsp.UnsupportedAudio):
+        dsp.render_effects(io.BytesIO(audio.getvalue()), {"reverse": {}})
+
+    class Sox:
+        def run(self, audio):
+            return b"sox"
+
+    chain = EffectChain({"reverse": {}})
+    monkeypatch.setattr(chain, "sox", lambda *args: Sox())
+    assert chain.render_audio(audio.getvalue()) == b"sox"
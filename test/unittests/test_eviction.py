@@ -0,0 +1,137 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from text2speech import cache as cache_module
+from text2speech.cache import TTSCache
+from conftest import write_wav
+
+
+class Clock:
+    """Ticks one second per reading so access order is unambiguous."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+@pytest.fixture
+def no_background(monkeypatch):
+    # evict() is called by the test, not by the eviction thread
+    monkeypatch.setattr(TTSCache, "_schedule_eviction", lambda self: None)
+
+
+def wav_size(tmp_path):
+    path = str(tmp_path / "probe.wav")
+    write_wav(path)
+    return os.path.getsize(path)
+
+
+def fill(cache, keys, engine="engine", voice="voice"):
+    paths = {}
+    for key in keys:
+        path = cache.path_for(key, "wav")
+        write_wav(path)
+        cache.put(key, path, engine=engine, voice=voice, audio_ext="wav")
+        paths[key] = path
+    return paths
+
+
+def assert_evicted(cache, paths, gone, kept):
+    for key in gone:
+        assert key not in cache
+        assert not os.path.exists(paths[key])
+    for key in kept:
+        assert key in cache
+        assert os.path.isfile(paths[key])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "eviction did not run"
+        time.sleep(0.01)
+
+
+def test_max_entries(tmp_path, no_background):
+    cache = TTSCache(str(tmp_path), max_entries=3)
+    paths = fill(cache, ["k0", "k1", "k2", "k3", "k4"])
+    assert cache.get("k0") is not None
+    assert cache.evict() == 2
+    assert len(cache) == 3
+    assert_evicted(cache, paths, gone=["k1", "k2"], kept=["k0", "k3", "k4"])
+
+
+def test_max_bytes(tmp_path, no_background):
+    size = wav_size(tmp_path)
+    cache = TTSCache(str(tmp_path / "cache"), max_bytes=3 * size)
+    paths = fill(cache, ["k0", "k1", "k2", "k3", "k4"])
+    assert cache.get("k0") is not None
+    assert cache.evict() == 2
+    assert cache.stats()["bytes"] <= 3 * size
+    assert_evicted(cache, paths, gone=["k1", "k2"], kept=["k0", "k3", "k4"])
+
+
+def test_engine_quota(tmp_path, no_background):
+    size = wav_size(tmp_path)
+    cache = TTSCache(str(tmp_path / "cache"), engine_quotas={"a": 2 * size})
+    paths = fill(cache, ["a0", "a1", "a2", "a3"], engine="a")
+    paths.update(fill(cache, ["b0", "b1", "b2"], engine="b"))
+    assert cache.get("a0") is not None
+    assert cache.evict() == 2
+    assert_evicted(cache, paths, gone=["a1", "a2"],
+                   kept=["a0", "a3", "b0", "b1", "b2"])
+
+
+def test_voice_quota(tmp_path, no_background):
+    size = wav_size(tmp_path)
+    cache = TTSCache(str(tmp_path / "cache"), voice_quotas={"x": 2 * size})
+    paths = fill(cache, ["x0", "x1", "x2", "x3"], voice="x")
+    paths.update(fill(cache, ["y0", "y1", "y2"], voice="y"))
+    assert cache.get("x0") is not None
+    assert cache.evict() == 2
+    assert_evicted(cache, paths, gone=["x1", "x2"],
+                   kept=["x0", "x3", "y0", "y1", "y2"])
+
+
+def test_memory_tier_evicted(tmp_path, no_background):
+    cache = TTSCache(str(tmp_path), max_entries=1,
+                     memory_bytes=1024 * 1024)
+    paths = fill(cache, ["k0", "k1"])
+    assert cache.get_audio("k0") is not None
+    cache.evict()
+    assert_evicted(cache, paths, gone=["k1"], kept=["k0"])
+    assert cache.get_audio("k1") is None
+
+
+def test_threshold_starts_background_eviction(tmp_path):
+    cache = TTSCache(str(tmp_path), max_entries=3, evict_threshold=1)
+    paths = fill(cache, ["k0", "k1", "k2"])
+    assert cache.get("k0") is not None
+    paths.update(fill(cache, ["k3"]))
+    wait_for(lambda: len(cache) == 3)
+    assert_evicted(cache, paths, gone=["k1"], kept=["k0", "k2", "k3"])
+
+
+def test_limits_enforced_on_open(tmp_path):
+    directory = str(tmp_path)
+    cache = TTSCache(directory)
+    paths = fill(cache, ["k0", "k1", "k2", "k3"])
+    assert cache.get("k0") is not None
+    cache.flush()
+
+    cache = TTSCache(directory, max_entries=2)
+    wait_for(lambda: len(cache) == 2)
+    assert_evicted(cache, paths, gone=["k1", "k2"], kept=["k0", "k3"])
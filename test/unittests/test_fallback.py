@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from text2speech.modules.fallback_tts import FallbackTTS
+from conftest import StubTTS
+
+
+class SlowTTS(StubTTS):
+    release = threading.Event()
+
+    def get_tts(self, sentence, wav_file):
+        self.release.wait(2)
+        return super().get_tts(sentence, wav_file)
+
+
+class SSMLTTS(StubTTS):
+    def __init__(self, config):
+        super().__init__(config)
+        self.ssml_tags = ["speak", "prosody"]
+        self.sentences = []
+
+    def get_tts(self, sentence, wav_file):
+        self.sentences.append(sentence)
+        return super().get_tts(sentence, wav_file)
+
+
+class Fallback(FallbackTTS):
+    ENGINES = {"slow": SlowTTS, "stub": StubTTS, "ssml": SSMLTTS}
+
+    def load_spellings(self, config=None):
+        return {}
+
+    @classmethod
+    def create_engine(cls, module, config):
+        return cls.ENGINES[module](config)
+
+
+@pytest.fixture
+def fallback(make_tts, tmp_path):
+    def make(*modules, **config):
+        engines = [{"module": module, "voice": "v",
+                    "cache": {"directory": str(tmp_path / module)}}
+                   for module in modules]
+        return make_tts(Fallback, engines=engines, **config)
+
+    yield make
+    SlowTTS.release.set()
+
+
+def test_fallback_does_not_queue_behind_abandoned_syntheses(fallback):
+    tts = fallback("slow", "stub", budget=0.2)
+    start = time.monotonic()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(tts.synthesize,
+                                ["chunk {}".format(i) for i in range(8)]))
+    assert time.monotonic() - start < 1
+    assert all(tts._producers[wav] is tts.engines[1] for wav, _ in results)
+
+
+def test_engines_preprocess_ssml_themselves(fallback):
+    tts = fallback("ssml", "stub")
+    sentence = "<speak>hello <prosody rate='fast'>world</prosody></speak>"
+    chunks = tts.preprocess(sentence)
+    assert chunks == [sentence]
+    tts.synthesize(chunks[0])
+    assert tts.engines[0].sentences == [sentence]
+    # served from the cache of the engine that synthesized it
+    assert tts.synthesize(sentence)[0] == tts.synthesize(chunks[0])[0]
+    assert len(tts.engines[0].sentences) == 1
@@ -0,0 +1,60 @@
+import base64
+import io
+import json
+import wave
+
+import pytest
+from requests.exceptions import ReadTimeout
+
+from text2speech.modules.mimic2_tts import Mimic2
+from conftest import write_wav
+
+
+class Mimic2TTS(Mimic2):
+    def load_spellings(self, config=None):
+        return {}
+
+
+def chunk_response(frames):
+    audio = io.BytesIO()
+    write_wav(audio, frames)
+    return json.dumps({
+        "audio_base64": base64.b64encode(audio.getvalue()).decode(),
+        "visimes": [["a", 0.0], ["b", 0.05]]}).encode()
+
+
+# long enough to be split in two chunks
+SENTENCE = "{0}. {0}.".format(" ".join(["word"] * 20))
+
+
+@pytest.fixture
+def tts(make_tts, server):
+    return make_tts(Mimic2TTS, url=server.url + "/?text=")
+
+
+def test_chunks_merged(tts, server, tmp_path):
+    server.body = chunk_response(1600)
+    wav_file = str(tmp_path / "out.wav")
+    _, vis = tts.get_tts(SENTENCE, wav_file)
+    with wave.open(wav_file) as f:
+        assert f.getnframes() == 3200
+    assert [t for _, t in vis] == pytest.approx([0.0, 0.05, 0.1, 0.15])
+
+
+def test_invalid_response_raises_read_timeout(tts, server, tmp_path):
+    server.body = json.dumps({"visimes": []}).encode()
+    with pytest.raises(ReadTimeout):
+        tts.get_tts("hello", str(tmp_path / "out.wav"))
+    # retried on its own before giving up
+    assert server.hits == tts.chunk_retries + 1
+
+
+def test_missing_visimes(tts, server):
+    audio = json.loads(chunk_response(1600))["audio_base64"]
+    server.body = json.dumps({"audio_base64": audio,
+                              "visimes": []}).encode()
+    for _ in range(2):
+        # synthesized, then served from the cache
+        wav_file, phonemes = tts.synthesize("hello")
+        assert tts._playback_entry(wav_file, phonemes)[1]
+    assert server.hits == 1
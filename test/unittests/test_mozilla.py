@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from text2speech.modules.mozilla_tts import MozillaTTSServer
+
+
+class MozillaTTS(MozillaTTSServer):
+    def load_spellings(self, config=None):
+        return {}
+
+
+@pytest.fixture
+def tts(make_tts, server):
+    return make_tts(MozillaTTS, url=server.url, retries=0)
+
+
+def test_error_page_not_cached(tts, server):
+    server.status = 503
+    server.body = b"Service Unavailable"
+    with pytest.raises(RuntimeError):
+        tts.synthesize("hello")
+    assert b"".join(tts.synthesize_stream("hello")) == b""
+    assert tts.cache_stats()["entries"] == 0
+
+
+def test_async_error_page_not_cached(tts, server):
+    pytest.importorskip("aiohttp")
+    server.status = 500
+    with pytest.raises(RuntimeError):
+        asyncio.run(tts.asynthesize("hello"))
+    assert tts.cache_stats()["entries"] == 0
+
+
+def test_audio_cached(tts, server):
+    server.body = b"RIFF audio"
+    wav_file, _ = tts.synthesize("hello")
+    with open(wav_file, "rb") as f:
+        assert f.read() == b"RIFF audio"
+    assert b"".join(tts.synthesize_stream("hello")) == b"RIFF audio"
+    assert server.hits == 1
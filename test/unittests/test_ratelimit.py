@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from text2speech.ratelimit import MAX_WAIT, QueueTimeout, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_requests_within_burst_admitted(clock):
+    limiter = RateLimiter(requests_per_second=2, burst=2, clock=clock)
+    tickets = [limiter.enqueue() for _ in range(3)]
+    assert limiter.poll(tickets[0]) == 0
+    assert limiter.poll(tickets[1]) == 0
+    assert limiter.poll(tickets[2]) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter.poll(tickets[2]) == 0
+    assert limiter.stats()["admitted"] == 3
+
+
+def test_chars_rate(clock):
+    limiter = RateLimiter(chars_per_second=10, clock=clock)
+    first, second = limiter.enqueue(chars=10), limiter.enqueue(chars=5)
+    assert limiter.poll(first) == 0
+    assert limiter.poll(second) == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter.poll(second) == 0
+
+
+def test_long_request_delays_the_next(clock):
+    limiter = RateLimiter(chars_per_second=10, clock=clock)
+    first, second = limiter.enqueue(chars=30), limiter.enqueue(chars=10)
+    # above the capacity, admitted with a full bucket
+    assert limiter.poll(first) == 0
+    assert limiter.poll(second) == MAX_WAIT
+    clock.advance(2.9)
+    assert limiter.poll(second) == pytest.approx(0.1)
+    clock.advance(0.1)
+    assert limiter.poll(second) == 0
+
+
+def test_priority_order(clock):
+    limiter = RateLimiter(requests_per_second=1, burst=1, clock=clock)
+    assert limiter.poll(limiter.enqueue()) == 0
+    low = limiter.enqueue(priority=0)
+    high = limiter.enqueue(priority=5)
+    clock.advance(1)
+    # only the head of the queue is admitted
+    assert limiter.poll(low) > 0
+    assert limiter.poll(high) == 0
+    clock.advance(1)
+    assert limiter.poll(low) == 0
+
+
+def test_max_concurrent(clock):
+    limiter = RateLimiter(max_concurrent=1, clock=clock)
+    first = limiter.acquire()
+    second = limiter.enqueue()
+    assert limiter.poll(second) > 0
+    limiter.release(first)
+    # released twice is a no-op
+    limiter.release(first)
+    assert limiter.poll(second) == 0
+    assert limiter.stats()["in_flight"] == 1
+
+
+def test_queue_timeout(clock):
+    limiter = RateLimiter(requests_per_second=1, burst=1, timeout=2,
+                          clock=clock)
+    assert limiter.poll(limiter.enqueue()) == 0
+    ticket = limiter.enqueue(timeout=0.25)
+    assert limiter.poll(ticket) == pytest.approx(0.25)
+    clock.advance(0.25)
+    with pytest.raises(QueueTimeout):
+        limiter.poll(ticket)
+    assert limiter.stats()["timed_out"] == 1
+    assert limiter.queue_depth == 0
+
+
+def test_cancelled_request_leaves_the_queue(clock):
+    limiter = RateLimiter(requests_per_second=1, burst=1, clock=clock)
+    assert limiter.poll(limiter.enqueue()) == 0
+    first, second = limiter.enqueue(), limiter.enqueue()
+    limiter.cancel(first)
+    with pytest.raises(QueueTimeout):
+        limiter.poll(first)
+    clock.advance(1)
+    assert limiter.poll(second) == 0
+
+
+def test_rate_limited_engine_does_not_hedge(make_tts):
+    assert make_tts().hedge
+    assert not make_tts(rate_limit={"requests_per_second": 1}).hedge
+
+
+def test_async_waiters_hold_no_executor_threads(make_tts):
+    tts = make_tts(rate_limit={"max_concurrent": 1})
+    # more callers than the default executor has workers
+    sentences = ["chunk {}".format(i) for i in range(64)]
+
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(*(tts.asynthesize(s) for s in sentences)), 10)
+
+    assert len(asyncio.run(main())) == 64
+    stats = tts.rate_limiter.stats()
+    assert (stats["admitted"], stats["in_flight"]) == (64, 0)
+
+
+def test_async_cancelled_waiter_leaves_the_queue(clock):
+    limiter = RateLimiter(max_concurrent=1, clock=clock)
+
+    async def main():
+        first = await limiter.aacquire()
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queue_depth == 0
+        limiter.release(first)
+        second = await asyncio.wait_for(limiter.aacquire(), 1)
+        limiter.release(second)
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from text2speech.modules import RemoteTTS
+from conftest import StubTTS, StubValidator
+
+
+class Remote(RemoteTTS):
+    def __init__(self, config):
+        super().__init__(config, api_path="/say",
+                         validator=StubValidator(self))
+
+    def load_spellings(self, config=None):
+        return {}
+
+    def build_request_params(self, sentence):
+        return {"text": sentence}
+
+
+class EmptyTTS(StubTTS):
+    def get_tts(self, sentence, wav_file):
+        open(wav_file, "wb").close()
+        return wav_file, None
+
+
+@pytest.fixture
+def remote(make_tts, server):
+    return make_tts(Remote, url=server.url)
+
+
+def test_error_response_raises(remote, server):
+    server.status = 404
+    with pytest.raises(RuntimeError):
+        remote.synthesize("hello")
+    assert remote.cache_stats()["entries"] == 0
+
+
+def test_async_error_response_raises(remote, server):
+    pytest.importorskip("aiohttp")
+    server.status = 404
+    with pytest.raises(RuntimeError):
+        asyncio.run(remote.asynthesize("hello"))
+    assert remote.cache_stats()["entries"] == 0
+
+
+def test_audio_cached(remote, server):
+    server.body = b"RIFF audio"
+    wav_file, _ = remote.synthesize("hello")
+    with open(wav_file, "rb") as f:
+        assert f.read() == b"RIFF audio"
+
+
+def test_empty_output_not_cached(make_tts):
+    tts = make_tts(EmptyTTS)
+    with pytest.raises(RuntimeError):
+        tts.synthesize("hello")
+    assert tts.cache_stats()["entries"] == 0
+    assert not tts.queue.qsize()
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+
+from text2speech.cache import SingleFlight
+
+
+class Call:
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = None
+
+    async def __call__(self, value):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return value
+
+
+def test_do_coalesces_threads():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "audio"
+
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(flights.do("key", func)))
+        for _ in range(4)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["audio"] * 4
+    assert len(calls) == 1
+
+
+def test_ado_coalesces():
+    call = Call()
+
+    async def main():
+        flights = SingleFlight()
+        call.release = asyncio.Event()
+        tasks = [asyncio.create_task(flights.ado("key", call, "audio"))
+                 for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == ["audio"] * 3
+    assert call.calls == 1
+
+
+def test_ado_leader_cancelled_waiter_gets_result():
+    call = Call()
+
+    async def main():
+        flights = SingleFlight()
+        call.release = asyncio.Event()
+        leader = asyncio.create_task(flights.ado("key", call, "audio"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.ado("key", call, "audio"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        call.release.set()
+        return await waiter
+
+    assert asyncio.run(main()) == "audio"
+    assert call.calls == 1 and not call.cancelled
+
+
+def test_ado_cancelled_once_every_caller_is_gone():
+    call = Call()
+
+    async def main():
+        flights = SingleFlight()
+        call.release = asyncio.Event()
+        callers = [asyncio.create_task(flights.ado("key", call, "audio"))
+                   for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert call.cancelled
+        # a new caller starts a new call
+        call.release.set()
+        return await flights.ado("key", call, "again")
+
+    assert asyncio.run(main()) == "again"
+    assert call.calls == 2
+
+
+def test_ado_error_raised_to_every_caller():
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("no audio")
+
+    async def main():
+        flights = SingleFlight()
+        return await asyncio.gather(
+            *(flights.ado("key", fail) for _ in range(2)),
+            return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in errors)
@@ -0,0 +1,186 @@
+import io
+import time
+
+import pytest
+import requests
+
+from text2speech import transport
+
+
+def test_post_not_retried_after_read_timeout(server):
+    server.delay = 0.3
+    session = transport.build_session(retries=2, backoff=0)
+    with pytest.raises(requests.ReadTimeout):
+        session.post(server.url, data="text", timeout=0.1)
+    assert server.hits == 1
+
+
+def test_get_retried_after_read_timeout(server):
+    server.delay = 0.3
+    session = transport.build_session(retries=2, backoff=0)
+    with pytest.raises(requests.ConnectionError):
+        session.get(server.url, timeout=0.1)
+    assert server.hits == 3
+
+
+def test_too_many_requests_not_retried(server):
+    server.status = 429
+    session = transport.build_session(retries=2, backoff=0)
+    assert session.get(server.url).status_code == 429
+    assert server.hits == 1
+
+
+def _timed_out(tts, server):
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        tts.hedged_request(lambda timeout: tts.hedged_session.get(
+            server.url, timeout=timeout))
+    return time.monotonic() - start
+
+
+def test_hedged_request_deadline_covers_retries(make_tts, server):
+    tts = make_tts(timeout=0.3, hedge=False)
+    server.delay = 1
+    assert _timed_out(tts, server) < 0.6
+    assert server.hits == 1
+
+
+def test_hedged_request_deadline_covers_hedge(make_tts, server):
+    tts = make_tts(timeout=0.3)
+    for _ in range(tts.latency.min_samples):
+        tts.latency.record(0.1)
+    server.delay = 1
+    assert _timed_out(tts, server) < 0.6
+    assert server.hits == 2
+
+
+def test_hedge_without_time_left_sends_no_duplicate():
+    calls = []
+
+    def send():
+        calls.append(1)
+        time.sleep(0.2)
+        response = requests.Response()
+        response.raw = io.BytesIO()
+        return response
+
+    with pytest.raises(requests.Timeout):
+        transport.hedge(send, 0.1, time.monotonic() + 0.05)
+    assert len(calls) == 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_and_probes():
+    clock = Clock()
+    breaker = transport.CircuitBreaker(failure_threshold=2, reset_timeout=10,
+                                       clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+    clock.now = 10
+    assert breaker.probe_due
+    # a single probe is let through
+    assert breaker.allow() and breaker.state == breaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.failures == 0
+
+
+def test_endpoint_pool_least_outstanding():
+    pool = transport.EndpointPool(["http://a", "http://b"])
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.url, second.url} == {"http://a", "http://b"}
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_endpoint_pool_skips_open_circuit_until_probe():
+    clock = Clock()
+    pool = transport.EndpointPool(["http://a", "http://b"],
+                                  failure_threshold=1, reset_timeout=5,
+                                  clock=clock)
+    a, b = pool.endpoints
+    pool.release(pool.acquire(exclude=[b]), ok=False)
+    assert a.breaker.state == a.breaker.OPEN
+    for _ in range(3):
+        endpoint = pool.acquire()
+        assert endpoint is b
+        pool.release(endpoint)
+    clock.now = 5
+    # the due probe goes first, the other open circuits are untouched
+    probe = pool.acquire()
+    assert probe is a and a.breaker.state == a.breaker.HALF_OPEN
+    assert pool.acquire() is b
+    pool.release(probe)
+    assert a.breaker.state == a.breaker.CLOSED
+
+
+def test_endpoint_pool_fails_over():
+    pool = transport.EndpointPool(["http://a", "http://b"],
+                                  failure_threshold=1)
+    sent = []
+
+    def send(url):
+        sent.append(url)
+        if len(sent) == 1:
+            raise requests.ConnectionError("refused")
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+    assert pool.request(send).status_code == 200
+    assert len(set(sent)) == 2
+    failed = next(e for e in pool.endpoints if e.url == sent[0])
+    assert failed.breaker.state == failed.breaker.OPEN
+
+
+def test_failover_within_the_deadline(make_tts, make_server):
+    servers = [make_server(), make_server()]
+    for server in servers:
+        server.delay = 1
+    tts = make_tts(timeout=0.4, hedge=False)
+    pool = tts.get_endpoints([server.url for server in servers])
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        tts.hedged_request(lambda timeout: pool.request(
+            lambda url, left: tts.hedged_session.get(url, timeout=left),
+            timeout))
+    assert time.monotonic() - start < 0.7
+    assert sum(server.hits for server in servers) == 1
+
+
+def test_failover_to_a_healthy_endpoint(make_tts, make_server):
+    down, up = make_server(), make_server()
+    down.status = 503
+    pool = transport.EndpointPool([down.url, up.url])
+    session = transport.build_session(retries=0)
+    for _ in range(2):
+        response = pool.request(
+            lambda url, left: session.get(url, timeout=left), 5)
+        assert response.status_code == 200
+    assert up.hits == 2
+
+
+def test_non_idempotent_request_not_hedged(make_tts, server):
+    tts = make_tts(timeout=0.5)
+    for _ in range(tts.latency.min_samples):
+        tts.latency.record(0.05)
+    server.delay = 0.2
+    response = tts.hedged_request(
+        lambda timeout: tts.hedged_session.post(server.url, data="text",
+                                                timeout=timeout),
+        idempotent=False)
+    assert response.status_code == 200
+    assert server.hits == 1
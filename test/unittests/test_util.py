@@ -0,0 +1,21 @@
+from text2speech.util import PhoneticSpellings
+
+
+def test_whole_words_case_insensitive():
+    spellings = PhoneticSpellings({"Mycroft": "my craft", "AI": "A I"})
+    assert spellings.apply("mycroft, MYCROFT's ai said: aim") == \
+        "my craft, MYCROFT's A I said: aim"
+
+
+def test_lookup_rebuilt_on_change():
+    spellings = PhoneticSpellings({"a": "x"})
+    assert spellings.apply("a b") == "x b"
+    spellings |= {"b": "y"}
+    assert spellings.apply("a b") == "x y"
+    spellings["a"] = "z"
+    assert spellings.apply("a b") == "z y"
+    spellings.update(b="w")
+    assert spellings.apply("a b") == "z w"
+    del spellings["a"]
+    spellings.pop("b")
+    assert spellings.apply("a b") == "a b"
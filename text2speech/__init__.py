@@ -15,6 +15,7 @@ class TTSFactory:
     from text2speech.modules.voice_rss import VoiceRSSTTS
     from text2speech.modules.mbrola_tts import MbrolaTTS
     from text2speech.modules.mozilla_tts import MozillaTTSServer
+    from text2speech.modules.fallback_tts import FallbackTTS
 
     CLASSES = {
         "mimic": Mimic,
@@ -31,7 +32,8 @@ class TTSFactory:
         "festival": FestivalTTS,
         "mbrola": MbrolaTTS,
         "voicerss": VoiceRSSTTS,
-        "mozilla_server": MozillaTTSServer
+        "mozilla_server": MozillaTTSServer,
+        "fallback": FallbackTTS
     }
 
     @staticmethod
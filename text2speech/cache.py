@@ -0,0 +1,683 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+import wave
+from collections import OrderedDict, namedtuple
+from threading import Event, RLock, Thread
+
+from ovos_utils.log import LOG
+from text2speech.util import get_cache_directory
+
+CacheEntry = namedtuple("CacheEntry",
+                        ["key", "path", "engine", "voice", "lang",
+                         "audio_ext", "size", "duration", "phonemes",
+                         "last_access"])
+
+
+def audio_duration(path, audio=None):
+    """Read the duration of an audio file from its header.
+
+    Only wav files are inspected, other formats return None.
+
+    Args:
+        path (str): audio file path
+        audio (bytes): file contents, read from path if not given
+
+    Returns:
+        float: duration in seconds, or None if unknown
+    """
+    if not path.endswith(".wav"):
+        return None
+    try:
+        with wave.open(io.BytesIO(audio) if audio is not None else path,
+                       "rb") as f:
+            return f.getnframes() / float(f.getframerate())
+    except Exception:
+        return None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single call.
+
+    The first caller of a key runs the function, callers arriving while it
+    runs wait for it and get the same result, or the same exception.
+    """
+
+    class _Call:
+        __slots__ = ("done", "result", "error")
+
+        def __init__(self):
+            self.done = Event()
+            self.result = None
+            self.error = None
+
+    class _Flight:
+        __slots__ = ("task", "callers")
+
+        def __init__(self, task):
+            self.task = task
+            self.callers = 0
+
+    def __init__(self):
+        self.lock = RLock()
+        self._calls = {}
+        self._flights = {}
+
+    def do(self, key, func, *args):
+        """Call func(*args), unless a call for key is already running.
+
+        Args:
+            key (str): identifies calls with the same result
+            func (callable): function producing the result
+
+        Returns:
+            the result of func
+        """
+        with self.lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, func, *args):
+        """Asynchronous do, func is a coroutine function.
+
+        Calls are coalesced within the running event loop. The call runs as
+        its own task, a cancelled caller stops waiting for it and the call
+        is only cancelled once every caller is gone.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self.lock:
+            flight = self._flights.get(flight_key)
+            if flight is None:
+                flight = self._flights[flight_key] = self._Flight(
+                    loop.create_task(func(*args)))
+                flight.task.add_done_callback(
+                    lambda task: self._landed(flight_key, flight))
+            flight.callers += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            with self.lock:
+                flight.callers -= 1
+                abandoned = not flight.callers and not flight.task.done()
+                if abandoned and self._flights.get(flight_key) is flight:
+                    # later callers start a new call
+                    del self._flights[flight_key]
+            if abandoned:
+                flight.task.cancel()
+
+    def _landed(self, flight_key, flight):
+        with self.lock:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+        if not flight.task.cancelled():
+            # raised to the callers, if any are left
+            flight.task.exception()
+
+
+class MemoryCache:
+    """Byte bounded in-memory LRU holding audio and phonemes.
+
+    Args:
+        max_bytes (int): maximum size of the audio held in memory
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = RLock()
+        self._entries = OrderedDict()
+
+    def get(self, key, count=True):
+        """Look up a key, marking it as most recently used.
+
+        Args:
+            key (str): cache key
+            count (bool): record the lookup in the hit and miss counters
+
+        Returns:
+            tuple: (CacheEntry, audio bytes), or None on a miss
+        """
+        with self.lock:
+            item = self._entries.get(key)
+            if item is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return item
+
+    def put(self, key, entry, audio):
+        """Store audio for key, evicting least recently used entries.
+
+        Args:
+            key (str): cache key
+            entry (CacheEntry): disk cache entry the audio belongs to
+            audio (bytes): audio file contents
+
+        Returns:
+            bool: False if the audio is larger than the whole tier
+        """
+        if len(audio) > self.max_bytes:
+            return False
+        with self.lock:
+            self.remove(key)
+            self._entries[key] = (entry, audio)
+            self.size += len(audio)
+            while self.size > self.max_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self.size -= len(old)
+                self.evictions += 1
+        return True
+
+    def remove(self, key):
+        with self.lock:
+            item = self._entries.pop(key, None)
+            if item is not None:
+                self.size -= len(item[1])
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Return hit, miss and eviction counters of the tier."""
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "entries": len(self._entries),
+                    "bytes": self.size,
+                    "max_bytes": self.max_bytes}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TTSCache:
+    """Content-addressed TTS audio cache backed by a SQLite index.
+
+    Audio files live flat in ``directory`` named after their key, every
+    entry is recorded in a single index database together with its
+    metadata, so a lookup is one indexed query instead of a series of
+    filesystem stats.
+
+    When limits are configured the least recently accessed entries are
+    evicted by a background thread, woken up every time ``evict_threshold``
+    bytes have been written to the cache.
+
+    Optionally a MemoryCache tier of ``memory_bytes`` holds the audio of
+    recently rendered or read entries. get_audio serves it without reading
+    the file, which synthesize_stream uses to stream frequently spoken
+    phrases from memory, and get finds its entries without querying the
+    index.
+
+    Args:
+        directory (str): directory holding the audio files and the index,
+                         defaults to the "tts" cache directory
+        index_name (str): file name of the index database
+        max_bytes (int): maximum total size of the cached audio
+        max_entries (int): maximum number of cached entries
+        engine_quotas (dict): maximum bytes per engine name
+        voice_quotas (dict): maximum bytes per voice
+        evict_threshold (int): bytes written between eviction runs,
+                               defaults to 5% of max_bytes
+        memory_bytes (int): size of the in-memory tier, disabled if not set
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            engine TEXT,
+            voice TEXT,
+            lang TEXT,
+            audio_ext TEXT,
+            size INTEGER NOT NULL DEFAULT 0,
+            duration REAL,
+            phonemes TEXT,
+            created REAL,
+            last_access REAL
+        );
+        CREATE INDEX IF NOT EXISTS entries_last_access
+            ON entries (last_access);
+        CREATE INDEX IF NOT EXISTS entries_engine_access
+            ON entries (engine, last_access);
+        CREATE INDEX IF NOT EXISTS entries_voice_access
+            ON entries (voice, last_access);
+    """
+    # access times are batched in memory and written in a single
+    # transaction, so a hit never pays for a write
+    ACCESS_FLUSH_SIZE = 256
+    # entries deleted per transaction while evicting, the lock is released
+    # between batches so lookups are not stalled by a large eviction
+    EVICT_BATCH = 32
+
+    def __init__(self, directory=None, index_name="index.sqlite",
+                 max_bytes=None, max_entries=None, engine_quotas=None,
+                 voice_quotas=None, evict_threshold=None, memory_bytes=None):
+        self.directory = directory or get_cache_directory("tts")
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, index_name)
+        self.lock = RLock()
+        self._pending_access = {}
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.engine_quotas = engine_quotas or {}
+        self.voice_quotas = voice_quotas or {}
+        if evict_threshold is None:
+            evict_threshold = max_bytes // 20 if max_bytes else 1024 * 1024
+        self.evict_threshold = evict_threshold
+        self._written = 0
+        self._evict_event = Event()
+        self._evict_thread = None
+        self.memory = MemoryCache(memory_bytes) if memory_bytes else None
+        self.hits = 0
+        self.misses = 0
+        if self.has_limits:
+            # enforce limits on whatever a previous run left behind
+            self._schedule_eviction()
+
+    @property
+    def has_limits(self):
+        return bool(self.max_bytes is not None or
+                    self.max_entries is not None or
+                    self.engine_quotas or self.voice_quotas)
+
+    @staticmethod
+    def make_key(sentence, engine, voice, lang, audio_ext, params=None):
+        """Derive the cache key of a synthesized sentence.
+
+        Args:
+            sentence (str): text that is synthesized
+            engine (str): engine name
+            voice (str): voice used
+            lang (str): language used
+            audio_ext (str): audio format produced by the engine
+            params (dict): any other setting that changes the audio
+
+        Returns:
+            str: hex digest identifying the audio
+        """
+        data = json.dumps([sentence, engine, voice, lang, audio_ext,
+                           params or {}], sort_keys=True, default=str)
+        return hashlib.md5(data.encode("utf-8", "ignore")).hexdigest()
+
+    def path_for(self, key, audio_ext):
+        """Return the file path audio for key should be written to."""
+        return os.path.join(self.directory, key + "." + audio_ext)
+
+    @staticmethod
+    def temp_path(path):
+        """Return a unique path to write audio to before moving it to path.
+
+        The extension is kept, engines may pick the format from it.
+        """
+        root, ext = os.path.splitext(path)
+        return "{}.{}.tmp{}".format(root, uuid.uuid4().hex, ext)
+
+    def get(self, key, count=True):
+        """Look up a cache entry.
+
+        Args:
+            key (str): cache key
+            count (bool): record the lookup in the hit and miss counters,
+                          disabled for re-checks of a lookup already counted
+
+        Returns:
+            CacheEntry: the entry, or None on a cache miss
+        """
+        entry = self._get(key, count)
+        if count:
+            with self.lock:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return entry
+
+    def _get(self, key, count):
+        with self.lock:
+            now = time.time()
+            hot = self.memory.get(key, count) \
+                if self.memory is not None else None
+            if hot is None:
+                row = self._db.execute(
+                    "SELECT key, path, engine, voice, lang, audio_ext, size, "
+                    "duration, phonemes, last_access FROM entries "
+                    "WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+            # the file may have been deleted behind the index, e.g. by a tmp
+            # cleaner, the entry is dropped so the sentence is synthesized
+            # again instead of queueing a missing file
+            path = hot[0].path if hot is not None else row[1]
+            if not os.path.isfile(path):
+                LOG.debug("Cached TTS file is gone: {}".format(path))
+                self._drop(key)
+                return None
+            self._pending_access[key] = now
+            if len(self._pending_access) >= self.ACCESS_FLUSH_SIZE:
+                self.flush()
+        if hot is not None:
+            return hot[0]._replace(last_access=now)
+
+        entry = CacheEntry(*row)
+        phonemes = json.loads(entry.phonemes) if entry.phonemes else None
+        return entry._replace(phonemes=phonemes, last_access=now)
+
+    def get_audio(self, key, count=True):
+        """Return the cached audio of key as bytes.
+
+        Audio read from disk is promoted to the memory tier, the following
+        requests are served without reading the file.
+
+        Args:
+            key (str): cache key
+            count (bool): record the lookup in the hit and miss counters
+
+        Returns:
+            bytes: audio file contents, or None on a cache miss
+        """
+        if self.memory is not None:
+            hot = self.memory.get(key, count)
+            if hot is not None:
+                with self.lock:
+                    if count:
+                        self.hits += 1
+                    self._pending_access[key] = time.time()
+                return hot[1]
+        # the memory tier lookup was counted already
+        entry = self._get(key, count=False)
+        audio = self._read(entry.path) if entry is not None else None
+        if entry is not None and audio is None:
+            self._drop(key)
+        with self.lock:
+            if count:
+                if audio is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if audio is None:
+                return None
+        if self.memory is not None and len(audio) <= self.memory.max_bytes:
+            self.memory.put(key, entry, audio)
+        return audio
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, path, engine=None, voice=None, lang=None,
+            audio_ext=None, phonemes=None):
+        """Record a synthesized file in the index.
+
+        Args:
+            key (str): cache key
+            path (str): audio file holding the synthesized sentence
+            engine (str): engine name
+            voice (str): voice used
+            lang (str): language used
+            audio_ext (str): audio format
+            phonemes: phoneme payload returned by the engine, must be json
+                      serializable
+
+        Returns:
+            CacheEntry: the new entry, or None if path does not exist
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            LOG.warning("Not caching missing TTS file: {}".format(path))
+            return None
+        return self._index(key, path, engine, voice, lang, audio_ext, size,
+                           audio_duration(path), phonemes)
+
+    def put_bytes(self, key, audio, engine=None, voice=None, lang=None,
+                  audio_ext=None, phonemes=None):
+        """Write audio held in memory to the cache.
+
+        The file is written once and replaces any file at the key's path
+        atomically, the audio also populates the memory tier without being
+        read back from disk.
+
+        Args:
+            key (str): cache key
+            audio (bytes): audio file contents
+            engine (str): engine name
+            voice (str): voice used
+            lang (str): language used
+            audio_ext (str): audio format
+            phonemes: phoneme payload returned by the engine, must be json
+                      serializable
+
+        Returns:
+            CacheEntry: the new entry
+        """
+        path = self.path_for(key, audio_ext)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        entry = self._index(key, path, engine, voice, lang, audio_ext,
+                            len(audio), audio_duration(path, audio), phonemes)
+        if self.memory is not None:
+            self.memory.put(key, entry, audio)
+        return entry
+
+    def _index(self, key, path, engine, voice, lang, audio_ext, size,
+               duration, phonemes):
+        now = time.time()
+        with self.lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, path, engine, voice, "
+                "lang, audio_ext, size, duration, phonemes, created, "
+                "last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, path, engine, voice, lang, audio_ext, size, duration,
+                 json.dumps(phonemes) if phonemes else None, now, now))
+            self._pending_access.pop(key, None)
+            if self.memory is not None:
+                self.memory.remove(key)
+            self._written += size
+            if self.has_limits and self._written >= self.evict_threshold:
+                self._written = 0
+                self._schedule_eviction()
+        return CacheEntry(key, path, engine, voice, lang, audio_ext, size,
+                          duration, phonemes, now)
+
+    def _drop(self, key):
+        """Delete the index entry of a key whose file is unreadable."""
+        with self.lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._pending_access.pop(key, None)
+            if self.memory is not None:
+                self.memory.remove(key)
+
+    def remove(self, key):
+        """Delete an entry and its audio file."""
+        with self.lock:
+            row = self._db.execute("SELECT path FROM entries WHERE key = ?",
+                                   (key,)).fetchone()
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._pending_access.pop(key, None)
+            if self.memory is not None:
+                self.memory.remove(key)
+        if row:
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+
+    def _schedule_eviction(self):
+        if self._evict_thread is None:
+            self._evict_thread = Thread(target=self._eviction_loop,
+                                        name="TTSCacheEviction", daemon=True)
+            self._evict_thread.start()
+        self._evict_event.set()
+
+    def _eviction_loop(self):
+        while True:
+            self._evict_event.wait()
+            self._evict_event.clear()
+            try:
+                self.evict()
+            except Exception:
+                LOG.exception("TTS cache eviction failed")
+
+    def evict(self):
+        """Delete least recently accessed entries until within limits.
+
+        Returns:
+            int: number of evicted entries
+        """
+        self.flush()
+        evicted = 0
+        for engine, quota in self.engine_quotas.items():
+            evicted += self._evict(" WHERE engine = ?", (engine,), quota)
+        for voice, quota in self.voice_quotas.items():
+            evicted += self._evict(" WHERE voice = ?", (voice,), quota)
+        evicted += self._evict("", (), self.max_bytes, self.max_entries)
+        if evicted:
+            LOG.debug("Evicted {} entries from TTS cache".format(evicted))
+        return evicted
+
+    def _evict(self, where, args, max_bytes=None, max_entries=None):
+        with self.lock:
+            size, count = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries" +
+                where, args).fetchone()
+
+        def over_limit():
+            return (max_bytes is not None and size > max_bytes) or \
+                   (max_entries is not None and count > max_entries)
+
+        evicted = 0
+        while over_limit():
+            victims = []
+            with self.lock:
+                rows = self._db.execute(
+                    "SELECT key, path, size FROM entries" + where +
+                    " ORDER BY last_access LIMIT ?",
+                    args + (self.EVICT_BATCH,)).fetchall()
+                for key, path, fsize in rows:
+                    if not over_limit():
+                        break
+                    victims.append((key, path))
+                    size -= fsize
+                    count -= 1
+                if not victims:
+                    break
+                self._db.execute("BEGIN")
+                self._db.executemany("DELETE FROM entries WHERE key = ?",
+                                     [(k,) for k, _ in victims])
+                self._db.execute("COMMIT")
+                if self.memory is not None:
+                    for key, _ in victims:
+                        self.memory.remove(key)
+            for _, path in victims:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            evicted += len(victims)
+        return evicted
+
+    def flush(self):
+        """Write batched access times to the index."""
+        with self.lock:
+            if not self._pending_access:
+                return
+            pending = [(t, k) for k, t in self._pending_access.items()]
+            self._pending_access = {}
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE entries SET last_access = ? WHERE key = ?", pending)
+            self._db.execute("COMMIT")
+
+    def clear(self):
+        """Delete every entry and audio file in the cache."""
+        with self.lock:
+            paths = [r[0] for r in
+                     self._db.execute("SELECT path FROM entries")]
+            self._db.execute("DELETE FROM entries")
+            self._pending_access = {}
+            if self.memory is not None:
+                self.memory.clear()
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return lookup counters, size of the cache and memory tier stats.
+
+        Returns:
+            dict: hits, misses, entries, bytes and the "memory" tier stats,
+                  None if the tier is disabled
+        """
+        with self.lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "entries": entries,
+                    "bytes": size,
+                    "memory": self.memory.stats()
+                    if self.memory is not None else None}
+
+    def __contains__(self, key):
+        with self.lock:
+            return self._db.execute("SELECT 1 FROM entries WHERE key = ?",
+                                    (key,)).fetchone() is not None
+
+    def __len__(self):
+        with self.lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -0,0 +1,360 @@
+"""In-process audio effects operating on PCM arrays.
+
+Implements a subset of the TTSMutator (sox) effects with NumPy, using the
+same configuration schema, so effects can be applied without forking a
+sox process and re-reading the audio from disk. The biquad filters follow
+the Audio EQ Cookbook, as sox does. Filters need scipy to run in
+process, the pure python recurrence used without it is slower than sox.
+"""
+import io
+import math
+import wave
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.signal import lfilter as _lfilter
+except ImportError:
+    _lfilter = None
+
+# effects filtering sample by sample, see supports
+IIR_EFFECTS = ("highpass", "lowpass", "bandpass", "bandreject", "allpass",
+               "equalizer", "bass", "treble", "compand")
+
+
+class UnsupportedAudio(ValueError):
+    """Audio format the in-process effects can not read, sox can."""
+
+
+def read_wav(path):
+    """Read a PCM wav file.
+
+    Args:
+        path (str): wav file path or file object
+
+    Returns:
+        tuple: (float samples of shape (frames, channels) in [-1, 1],
+                sample rate, sample width in bytes)
+
+    Raises:
+        UnsupportedAudio: not an 8, 16 or 32 bit PCM wav file
+    """
+    try:
+        with wave.open(path, "rb") as f:
+            channels = f.getnchannels()
+            width = f.getsampwidth()
+            rate = f.getframerate()
+            data = f.readframes(f.getnframes())
+    except wave.Error as e:
+        # e.g. float or compressed samples
+        raise UnsupportedAudio(str(e))
+    return decode_pcm(data, width, channels), rate, width
+
+
+def write_wav(path, samples, rate, width=2):
+    """Write float samples as a PCM wav file.
+
+    Args:
+        path (str): output path or file object
+        samples (np.ndarray): samples of shape (frames, channels)
+        rate (int): sample rate
+        width (int): sample width in bytes
+    """
+    with wave.open(path, "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(width)
+        f.setframerate(rate)
+        f.writeframes(encode_pcm(samples, width))
+
+
+def decode_pcm(data, width, channels):
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+                   - 128) / 128
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(data, dtype=dtype).astype(np.float32) / \
+            float(2 ** (8 * width - 1))
+    else:
+        raise UnsupportedAudio("unsupported sample width: {}".format(width))
+    return samples.reshape(-1, channels)
+
+
+def encode_pcm(samples, width):
+    samples = np.clip(samples, -1.0, 1.0)
+    if width == 1:
+        return (samples * 127 + 128).astype(np.uint8).tobytes()
+    scale = 2 ** (8 * width - 1) - 1
+    dtype = np.int16 if width == 2 else np.int32
+    return np.round(samples * scale).astype(dtype).tobytes()
+
+
+def convert(samples, rate, new_rate, channels):
+    """Resample and remix samples.
+
+    Args:
+        samples (np.ndarray): samples of shape (frames, channels)
+        rate (int): sample rate of samples
+        new_rate (int): target sample rate
+        channels (int): target channel count
+
+    Returns:
+        np.ndarray: converted samples
+    """
+    if samples.shape[1] != channels:
+        if channels == 1:
+            samples = samples.mean(axis=1, keepdims=True)
+        else:
+            samples = np.repeat(samples.mean(axis=1, keepdims=True),
+                                channels, axis=1)
+    if rate != new_rate and samples.shape[0]:
+        samples = speed(samples, rate, rate / new_rate)
+    return samples
+
+
+def lfilter(b, a, x):
+    """Apply an IIR filter along the first axis of x."""
+    b = [c / a[0] for c in b]
+    a = [c / a[0] for c in a]
+    if _lfilter is not None:
+        return _lfilter(b, a, x, axis=0).astype(np.float32)
+    # transposed direct form II, one sample at a time
+    b = b + [0.0] * (3 - len(b))
+    a = a + [0.0] * (3 - len(a))
+    b0, b1, b2 = b[:3]
+    _, a1, a2 = a[:3]
+    out = np.empty_like(x)
+    for ch in range(x.shape[1]):
+        z1 = z2 = 0.0
+        column = x[:, ch].tolist()
+        for i, xi in enumerate(column):
+            yi = b0 * xi + z1
+            z1 = b1 * xi - a1 * yi + z2
+            z2 = b2 * xi - a2 * yi
+            column[i] = yi
+        out[:, ch] = column
+    return out
+
+
+def _biquad_params(frequency, rate, width_q):
+    w0 = 2 * math.pi * frequency / rate
+    return math.cos(w0), math.sin(w0), math.sin(w0) / (2 * width_q)
+
+
+def _shelf(samples, rate, gain_db, frequency, slope, high):
+    A = 10 ** (gain_db / 40)
+    w0 = 2 * math.pi * frequency / rate
+    cos, sin = math.cos(w0), math.sin(w0)
+    alpha = sin / 2 * math.sqrt((A + 1 / A) * (1 / slope - 1) + 2)
+    sq = 2 * math.sqrt(A) * alpha
+    sign = -1 if high else 1
+    b = [A * ((A + 1) - sign * (A - 1) * cos + sq),
+         sign * 2 * A * ((A - 1) - sign * (A + 1) * cos),
+         A * ((A + 1) - sign * (A - 1) * cos - sq)]
+    a = [(A + 1) + sign * (A - 1) * cos + sq,
+         -sign * 2 * ((A - 1) + sign * (A + 1) * cos),
+         (A + 1) + sign * (A - 1) * cos - sq]
+    return lfilter(b, a, samples)
+
+
+def _one_pole(samples, rate, frequency, high):
+    p = math.exp(-2 * math.pi * frequency / rate)
+    if high:
+        return lfilter([(1 + p) / 2, -(1 + p) / 2], [1, -p], samples)
+    return lfilter([1 - p], [1, -p], samples)
+
+
+def highpass(samples, rate, frequency, width_q=0.707, n_poles=2):
+    if n_poles == 1:
+        return _one_pole(samples, rate, frequency, high=True)
+    cos, _, alpha = _biquad_params(frequency, rate, width_q)
+    return lfilter([(1 + cos) / 2, -(1 + cos), (1 + cos) / 2],
+                   [1 + alpha, -2 * cos, 1 - alpha], samples)
+
+
+def lowpass(samples, rate, frequency, width_q=0.707, n_poles=2):
+    if n_poles == 1:
+        return _one_pole(samples, rate, frequency, high=False)
+    cos, _, alpha = _biquad_params(frequency, rate, width_q)
+    return lfilter([(1 - cos) / 2, 1 - cos, (1 - cos) / 2],
+                   [1 + alpha, -2 * cos, 1 - alpha], samples)
+
+
+def bandpass(samples, rate, frequency, width_q=2.0, constant_skirt=False):
+    cos, sin, alpha = _biquad_params(frequency, rate, width_q)
+    peak = sin / 2 if constant_skirt else alpha
+    return lfilter([peak, 0, -peak], [1 + alpha, -2 * cos, 1 - alpha],
+                   samples)
+
+
+def bandreject(samples, rate, frequency, width_q=2.0):
+    cos, _, alpha = _biquad_params(frequency, rate, width_q)
+    return lfilter([1, -2 * cos, 1], [1 + alpha, -2 * cos, 1 - alpha],
+                   samples)
+
+
+def allpass(samples, rate, frequency, width_q=2.0):
+    cos, _, alpha = _biquad_params(frequency, rate, width_q)
+    return lfilter([1 - alpha, -2 * cos, 1 + alpha],
+                   [1 + alpha, -2 * cos, 1 - alpha], samples)
+
+
+def equalizer(samples, rate, frequency, width_q, gain_db):
+    A = 10 ** (gain_db / 40)
+    cos, _, alpha = _biquad_params(frequency, rate, width_q)
+    return lfilter([1 + alpha * A, -2 * cos, 1 - alpha * A],
+                   [1 + alpha / A, -2 * cos, 1 - alpha / A], samples)
+
+
+def bass(samples, rate, gain_db, frequency=100.0, slope=0.5):
+    return _shelf(samples, rate, gain_db, frequency, slope, high=False)
+
+
+def treble(samples, rate, gain_db, frequency=3000.0, slope=0.5):
+    return _shelf(samples, rate, gain_db, frequency, slope, high=True)
+
+
+def gain(samples, rate, gain_db=0.0, normalize=True, limiter=False,
+         balance=None):
+    factor = 10 ** (gain_db / 20)
+    if normalize:
+        peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+        if peak > 0:
+            factor /= peak
+    samples = samples * factor
+    if limiter:
+        samples = np.tanh(samples)
+    return samples
+
+
+def tremolo(samples, rate, speed=6.0, depth=40.0):
+    t = np.arange(samples.shape[0], dtype=np.float32) / rate
+    modulation = 1 - depth / 100 * (0.5 + 0.5 * np.sin(2 * np.pi * speed * t))
+    return samples * modulation[:, None]
+
+
+def echo(samples, rate, gain_in=0.8, gain_out=0.9, n_echos=1, delays=None,
+         decays=None):
+    delays = delays or [60]
+    decays = decays or [0.4]
+    offsets = [int(rate * d / 1000) for d in delays]
+    out = np.zeros((samples.shape[0] + max(offsets), samples.shape[1]),
+                   dtype=np.float32)
+    out[:samples.shape[0]] += samples * gain_in
+    for offset, decay in zip(offsets, decays):
+        out[offset:offset + samples.shape[0]] += samples * gain_in * decay
+    return out * gain_out
+
+
+def reverse(samples, rate):
+    return samples[::-1].copy()
+
+
+def speed(samples, rate, factor):
+    frames = samples.shape[0]
+    new_frames = max(int(frames / factor), 1)
+    positions = np.linspace(0, frames - 1, new_frames)
+    return np.stack([np.interp(positions, np.arange(frames), samples[:, ch])
+                     for ch in range(samples.shape[1])],
+                    axis=1).astype(np.float32)
+
+
+def compand(samples, rate, attack_time=0.3, decay_time=0.8,
+            soft_knee_db=6.0, tf_points=None):
+    """Compand with a one pole envelope follower.
+
+    The envelope uses the mean of attack_time and decay_time as its time
+    constant and the soft knee is not applied, so results are close to but
+    not identical with sox.
+    """
+    tf_points = sorted(tf_points or [(-70, -70), (-60, -20), (0, 0)])
+    tau = (attack_time + decay_time) / 2
+    p = math.exp(-1 / (tau * rate))
+    level = np.max(np.abs(samples), axis=1, keepdims=True)
+    envelope = lfilter([1 - p], [1, -p], level)
+    env_db = 20 * np.log10(np.maximum(envelope, 1e-6))
+    xs = [x for x, _ in tf_points]
+    ys = [y for _, y in tf_points]
+    out_db = np.interp(env_db, xs, ys)
+    return samples * (10 ** ((out_db - env_db) / 20)).astype(np.float32)
+
+
+EFFECTS = {
+    "highpass": highpass,
+    "lowpass": lowpass,
+    "bandpass": bandpass,
+    "bandreject": bandreject,
+    "allpass": allpass,
+    "equalizer": equalizer,
+    "bass": bass,
+    "treble": treble,
+    "gain": gain,
+    "tremolo": tremolo,
+    "echo": echo,
+    "reverse": reverse,
+    "speed": speed,
+    "compand": compand
+}
+
+
+def supports(effects):
+    """Check if an effects config can be applied in process.
+
+    Args:
+        effects (dict): TTSMutator style effects config
+
+    Returns:
+        bool: True if numpy is available and every effect is implemented,
+              filters also need scipy
+    """
+    if np is None:
+        return False
+    if any(name not in EFFECTS for name in effects):
+        return False
+    if _lfilter is None and any(name in IIR_EFFECTS for name in effects):
+        return False
+    # gain balancing needs per channel analysis only sox implements
+    return not (effects.get("gain") or {}).get("balance")
+
+
+def _process(src, effects):
+    samples, rate, width = read_wav(src)
+    for name, params in effects.items():
+        samples = EFFECTS[name](samples, rate, **(params or {}))
+    return samples, rate, width
+
+
+def apply_effects(path, effects, out_path=None):
+    """Apply a TTSMutator style effects config to a wav file.
+
+    Args:
+        path (str): input wav file
+        effects (dict): effect name -> parameters
+        out_path (str): output path, defaults to overwriting path
+
+    Returns:
+        str: output path
+    """
+    samples, rate, width = _process(path, effects)
+    out_path = out_path or path
+    write_wav(out_path, samples, rate, width)
+    return out_path
+
+
+def render_effects(src, effects):
+    """Apply a TTSMutator style effects config, returning the wav bytes.
+
+    Args:
+        src (str): input wav file path or file object
+        effects (dict): effect name -> parameters
+
+    Returns:
+        bytes: processed wav file contents
+    """
+    samples, rate, width = _process(src, effects)
+    out = io.BytesIO()
+    write_wav(out, samples, rate, width)
+    return out.getvalue()
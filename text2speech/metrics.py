@@ -0,0 +1,157 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+# histogram upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+class StageTimer:
+    """Context manager timing one pipeline stage.
+
+    Args:
+        metrics (TTSMetrics): registry receiving the measurement
+        stage (str): stage name
+        labels (dict): labels attached to the measurement
+    """
+    __slots__ = ("metrics", "stage", "labels", "start")
+
+    def __init__(self, metrics, stage, labels):
+        self.metrics = metrics
+        self.stage = stage
+        self.labels = labels
+        self.start = None
+
+    def label(self, **labels):
+        """Add labels only known once the stage ran, e.g. cache_hit."""
+        self.labels.update(labels)
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *args):
+        self.metrics.observe(self.stage, time.monotonic() - self.start,
+                             **self.labels)
+
+
+class NullTimer:
+    """Timer used while metrics are disabled, does nothing."""
+    __slots__ = ()
+
+    def label(self, **labels):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class TTSMetrics:
+    """Registry of TTS pipeline stage durations.
+
+    Every observation is aggregated into a histogram per stage and label
+    set, and handed to the registered callbacks.
+
+    Args:
+        buckets (tuple): histogram upper bounds in seconds
+    """
+    METRIC_NAME = "tts_stage_duration_seconds"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.callbacks = []
+        self.lock = Lock()
+        self._histograms = {}
+
+    def add_callback(self, callback):
+        """Register callback(stage, seconds, labels) for every observation."""
+        self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def time(self, stage, **labels):
+        """Return a context manager timing a stage."""
+        return StageTimer(self, stage, labels)
+
+    def observe(self, stage, seconds, **labels):
+        """Record the duration of a stage.
+
+        Args:
+            stage (str): stage name
+            seconds (float): duration
+            labels: extra labels, e.g. engine, voice, cache_hit
+        """
+        key = (stage,) + tuple(sorted(
+            (k, str(v).lower() if isinstance(v, bool) else str(v))
+            for k, v in labels.items()))
+        with self.lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # bucket counts, +Inf count, sum
+                hist = self._histograms[key] = \
+                    [[0] * len(self.buckets), 0, 0.0]
+            idx = bisect_left(self.buckets, seconds)
+            if idx < len(self.buckets):
+                hist[0][idx] += 1
+            hist[1] += 1
+            hist[2] += seconds
+        for callback in self.callbacks:
+            callback(stage, seconds, labels)
+
+    def snapshot(self):
+        """Return count and total seconds per (stage, labels) key."""
+        with self.lock:
+            return {key: {"count": hist[1], "sum": hist[2]}
+                    for key, hist in self._histograms.items()}
+
+    def reset(self):
+        with self.lock:
+            self._histograms = {}
+
+    @staticmethod
+    def _format_labels(labels):
+        def escape(value):
+            return value.replace("\\", "\\\\").replace("\n", "\\n") \
+                .replace('"', '\\"')
+        return ",".join('{}="{}"'.format(k, escape(v)) for k, v in labels)
+
+    def export_prometheus(self):
+        """Render all histograms in the Prometheus text exposition format.
+
+        Returns:
+            str: metrics text
+        """
+        name = self.METRIC_NAME
+        lines = ["# HELP {} Duration of TTS pipeline stages".format(name),
+                 "# TYPE {} histogram".format(name)]
+        with self.lock:
+            items = sorted(self._histograms.items())
+            for key, (counts, total, seconds) in items:
+                labels = (("stage", key[0]),) + key[1:]
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append("{}_bucket{{{}}} {}".format(
+                        name, self._format_labels(labels + (
+                            ("le", repr(float(bound))),)), cumulative))
+                lines.append("{}_bucket{{{}}} {}".format(
+                    name, self._format_labels(labels + (("le", "+Inf"),)),
+                    total))
+                lines.append("{}_sum{{{}}} {}".format(
+                    name, self._format_labels(labels), seconds))
+                lines.append("{}_count{{{}}} {}".format(
+                    name, self._format_labels(labels), total))
+        return "\n".join(lines) + "\n"
+
+
+# registry shared by engines configured with "metrics": true
+REGISTRY = TTSMetrics()
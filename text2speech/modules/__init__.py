@@ -1,23 +1,58 @@
-import subprocess
-from os.path import isfile
+import asyncio
 import hashlib
+import io
+import json
+import subprocess
 import os
 import random
-import re
-from tempfile import gettempdir
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from time import monotonic
+from tempfile import gettempdir, mkstemp
+from types import MappingProxyType
 import os.path
+import requests
 from requests_futures.sessions import FuturesSession
 from os.path import dirname, exists, isdir, join
-from text2speech.util import get_cache_directory, remove_last_slash
+from text2speech import dsp, transport
+from text2speech.cache import TTSCache, SingleFlight
+from text2speech.metrics import NULL_TIMER, REGISTRY
+from text2speech.ratelimit import RateLimiter
+from text2speech.sox import SoxCommand
+from text2speech.units import UnitInventory, UnitIndex, unit_text
+from text2speech.util import remove_last_slash, PhoneticSpellings
 from ovos_utils.lang.phonemes import get_phonemes
 from ovos_utils.log import LOG
 from ovos_utils.plugins.tts import TTS as _TTS, TTSValidator as _TTSValidator
+from ovos_utils.plugins.tts import EMPTY_PLAYBACK_QUEUE_TUPLE
+from ovos_utils.signal import create_signal
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
 
 
 class TTS(_TTS):
     works_offline = True
     voices = []
     audio_ext = "wav"
+    # synthesis in progress per cache key, shared by all engines
+    _flights = SingleFlight()
+    # engines implementing render_tts apply the voice effects while
+    # synthesizing, in the same pass
+    fuses_effects = False
+    # config keys that do not change the synthesized audio
+    cache_ignored_config = ["effects", "effects_backend", "cache",
+                            "pipeline_depth", "metrics", "timeout",
+                            "pool_size", "retries", "backoff",
+                            "failure_threshold", "reset_timeout", "hedge",
+                            "hedge_percentile", "rate_limit", "key",
+                            "key_id", "access_key_id", "secret_key",
+                            "secret_access_key", "apikey", "user",
+                            "username", "password"]
 
     def __init__(self, config=None, validator=None, audio_ext=None,
                  phonetic_spelling=True, ssml_tags=None, lang=None):
@@ -30,8 +65,55 @@ class TTS(_TTS):
                                   phonetic_spelling=phonetic_spelling,
                                   ssml_tags=ssml_tags)
 
-        self.effects = config.get("effects", {})
         self.filename = join(gettempdir(), '/tts.' + self.audio_ext)
+        cache_config = config.get("cache", {})
+        self.cache = TTSCache(
+            cache_config.get("directory"),
+            max_bytes=cache_config.get("max_bytes"),
+            max_entries=cache_config.get("max_entries"),
+            engine_quotas=cache_config.get("engine_quotas"),
+            voice_quotas=cache_config.get("voice_quotas"),
+            evict_threshold=cache_config.get("evict_threshold"),
+            memory_bytes=cache_config.get("memory_bytes"))
+        # also cache the audio before effects, so a changed effect chain
+        # is rendered again without synthesizing
+        self.cache_raw = cache_config.get("keep_raw", False)
+        # number of chunks synthesized ahead of the one being queued
+        self.pipeline_depth = config.get("pipeline_depth", 0)
+        self._executor = None
+        self._aiohttp_session = None
+        self._aiohttp_loop = None
+        # TTSMetrics receiving stage timings, None disables instrumentation
+        self.metrics = REGISTRY if config.get("metrics") else None
+        # http transport of remote engines
+        self.timeout = config.get("timeout", transport.DEFAULT_TIMEOUT)
+        self.pool_size = config.get("pool_size", transport.DEFAULT_POOL_SIZE)
+        self.retries = config.get("retries", transport.DEFAULT_RETRIES)
+        self.backoff = config.get("backoff", transport.DEFAULT_BACKOFF)
+        self.failure_threshold = config.get(
+            "failure_threshold", transport.DEFAULT_FAILURE_THRESHOLD)
+        self.reset_timeout = config.get("reset_timeout",
+                                        transport.DEFAULT_RESET_TIMEOUT)
+        # queues synthesis beyond the provider quota, None if unlimited
+        self.rate_limiter = RateLimiter.from_config(config.get("rate_limit"))
+        # request latencies, deadlines and hedging adapt to them
+        self.latency = transport.LatencyTracker()
+        # an admission pays for a single upstream request, a rate limited
+        # engine sends no duplicates
+        self.hedge = config.get("hedge", True) and self.rate_limiter is None
+        self.hedge_percentile = config.get(
+            "hedge_percentile", transport.DEFAULT_HEDGE_PERCENTILE)
+        # raises on invalid effects, so misconfiguration fails at startup
+        self.effects = EffectChain(config.get("effects"),
+                                   config.get("effects_backend", "auto"))
+
+    @property
+    def spellings(self):
+        return self._spellings
+
+    @spellings.setter
+    def spellings(self, spellings):
+        self._spellings = PhoneticSpellings(spellings or {})
 
     def validate(self):
         if self.validator:
@@ -42,74 +124,711 @@ class TTS(_TTS):
     def run(self, bus=None):
         self.init(bus)
 
+    def timer(self, stage, **labels):
+        """Time a pipeline stage, a no-op unless metrics are enabled.
+
+        Args:
+            stage (str): stage name
+            labels: labels added to the engine and voice labels
+
+        Returns:
+            context manager timing the stage
+        """
+        if self.metrics is None:
+            return NULL_TIMER
+        return self.metrics.time(stage, engine=self.tts_name,
+                                 voice=self.voice, **labels)
+
     def _execute(self, sentence, ident=None, listen=False):
         """
             Convert sentence to speech, preprocessing out unsupported ssml
 
-            The method caches results if possible using the hash of the
-            sentence.
+            The method caches results if possible, keyed by the sentence,
+            engine, voice, lang and engine settings.
 
             Args:
                 sentence:   Sentence to be spoken
                 ident:      Id reference to current interaction
         """
-        sentence = self.validate_ssml(sentence)
-
-        if self.phonetic_spelling:
-            for word in re.findall(r"[\w']+", sentence):
-                if word.lower() in self.spellings:
-                    sentence = sentence.replace(word,
-                                                self.spellings[word.lower()])
-        voice = self.voice or self.__class__.__name__ + "Default"
-
-        chunks = self._preprocess_sentence(sentence)
+        start = monotonic()
+        chunks = self.preprocess(sentence)
         # Apply the listen flag to the last chunk, set the rest to False
         chunks = [(chunks[i], listen if i == len(chunks) - 1 else False)
                   for i in range(len(chunks))]
 
-        for sentence, l in chunks:
-            key = str(hashlib.md5(
-                sentence.encode('utf-8', 'ignore')).hexdigest())
-            wav_file = os.path.join(get_cache_directory("tts"),
-                                    key + voice + '.' + self.audio_ext)
+        results = self._synthesize_chunks([c for c, _ in chunks])
+        for idx, ((_, l), (wav_file, phonemes)) in enumerate(zip(chunks,
+                                                                 results)):
+            audio_ext, vis = self._playback_entry(wav_file, phonemes)
+            self.queue.put((audio_ext, wav_file, vis, ident, l))
+            if idx == 0 and self.metrics is not None:
+                self.metrics.observe("first_chunk", monotonic() - start,
+                                     engine=self.tts_name, voice=self.voice)
 
-            if os.path.exists(wav_file):
-                LOG.debug("TTS cache hit")
-                phonemes = self.load_phonemes(key)
-            else:
-                wav_file, phonemes = self.get_tts(sentence, wav_file)
-                if phonemes:
-                    self.save_phonemes(key, phonemes)
-                else:
-                    phonemes = get_phonemes(sentence)
+    def _playback_entry(self, wav_file, phonemes):
+        """Return the audio format and visemes queued with a chunk.
+
+        Args:
+            wav_file (str): synthesized audio
+            phonemes: phonemes returned with the audio
 
-            wav_file = self.apply_voice_effects(wav_file)
+        Returns:
+            tuple: (audio_ext, visemes)
+        """
+        with self.timer("viseme"):
             vis = self.viseme(phonemes) if phonemes else None
-            self.queue.put((self.audio_ext, wav_file, vis, ident, l))
+        return self.audio_ext, vis
 
-    def apply_voice_effects(self, wav_file):
-        mutator = TTSMutator(wav_file, self.effects)
-        mutator.apply()
-        return wav_file
+    def _synthesize_chunks(self, chunks):
+        """Synthesize chunks, yielding results in order.
+
+        With pipeline_depth set, up to that many chunks are synthesized
+        concurrently ahead of the one being yielded, so a chunk can be
+        queued for playback as soon as it is ready while the next ones are
+        still being synthesized.
+
+        Args:
+            chunks (list): preprocessed chunks
+
+        Yields:
+            tuple: (wav_file, phonemes) for each chunk
+        """
+        if self.pipeline_depth < 2 or len(chunks) < 2:
+            for chunk in chunks:
+                yield self.synthesize(chunk)
+            return
+
+        # under rate limiting, chunks played sooner are synthesized first
+        def synthesize(idx, chunk):
+            return self.synthesize(chunk, priority=-idx)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pipeline_depth,
+                thread_name_prefix="TTSPipeline")
+        chunks = enumerate(chunks)
+        pending = deque(self._executor.submit(synthesize, idx, chunk)
+                        for idx, chunk in islice(chunks,
+                                                 self.pipeline_depth))
+        try:
+            while pending:
+                result = pending.popleft().result()
+                for idx, chunk in islice(chunks, 1):
+                    pending.append(self._executor.submit(synthesize, idx,
+                                                         chunk))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def preprocess(self, sentence):
+        """Prepare a sentence for synthesis and split it into chunks.
+
+        Unsupported ssml is removed, phonetic spellings are applied and
+        the result is split by _preprocess_sentence.
+
+        Args:
+            sentence (str): sentence to be spoken
+
+        Returns:
+            list: chunks to be synthesized
+        """
+        sentence = self._prepare_sentence(sentence)
+        with self.timer("chunking"):
+            return self._preprocess_sentence(sentence)
+
+    def _prepare_sentence(self, sentence):
+        """Remove unsupported ssml and apply the phonetic spellings.
+
+        Args:
+            sentence (str): sentence to be spoken
+
+        Returns:
+            str: the sentence as this engine synthesizes it
+        """
+        with self.timer("validate_ssml"):
+            sentence = self.validate_ssml(sentence)
+
+        if self.phonetic_spelling:
+            with self.timer("phonetic_spelling"):
+                sentence = self.spellings.apply(sentence)
+        return sentence
+
+    def synthesize(self, sentence, priority=0):
+        """Get the audio of a preprocessed chunk, using the cache if possible.
+
+        The cached audio already has the voice effects applied. Concurrent
+        calls for the same chunk are coalesced, a single synthesis runs and
+        every caller gets its result.
+
+        Args:
+            sentence (str): chunk to be synthesized
+            priority (int): rate limit queue priority, higher goes first
+
+        Returns:
+            tuple: (wav_file, phonemes)
+        """
+        key = self.get_cache_key(sentence)
+        cached = self._cached(key)
+        if cached:
+            return cached
+        return self._flights.do(key, self._synthesize, key, sentence,
+                                priority)
+
+    def _synthesize(self, key, sentence, priority=0):
+        # a concurrent synthesis may have finished since the lookup
+        entry = self.cache.get(key, count=False)
+        if entry:
+            return entry.path, entry.phonemes
+        cached = self._cached_raw(key, sentence)
+        if cached:
+            return cached
+        if self._fused:
+            with self.rate_limited(sentence, priority):
+                return self._render(key, sentence)
+
+        path = self._synthesis_path(key, sentence)
+        tmp_path = self.cache.temp_path(path)
+        try:
+            with self.rate_limited(sentence, priority), \
+                    self.timer("get_tts"):
+                wav_file, phonemes = self.get_tts(sentence, tmp_path)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+        wav_file = self._commit(tmp_path, wav_file, path)
+        return self._store(key, sentence, wav_file, phonemes)
+
+    @classmethod
+    def _commit(cls, tmp_path, wav_file, path):
+        """Move audio written to a temporary file to its cache path.
+
+        Engines write to a unique temporary file which atomically replaces
+        the cache file, so readers never see a partially written file.
+
+        Raises:
+            RuntimeError: the engine wrote no audio
+        """
+        if wav_file != tmp_path:
+            # the engine wrote somewhere else, cache that file
+            path = wav_file
+        else:
+            try:
+                os.replace(tmp_path, path)
+            except FileNotFoundError:
+                pass
+        if not cls.valid_audio(path):
+            if path != wav_file:
+                cls._discard(path)
+            raise RuntimeError("no audio was synthesized")
+        return path
+
+    @staticmethod
+    def valid_audio(path):
+        """Return True if path is an existing, non empty audio file."""
+        return bool(path) and os.path.isfile(path) and \
+            os.path.getsize(path) > 0
+
+    @staticmethod
+    def _discard(tmp_path):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    @property
+    def _fused(self):
+        # keeping the raw audio needs it written before effects are applied
+        return self.fuses_effects and bool(self.effects) and \
+            not self.cache_raw
+
+    def _render(self, key, sentence):
+        """Synthesize a chunk with effects in one pass and cache it."""
+        with self.timer("get_tts"):
+            audio, phonemes = self.render_tts(sentence)
+        if not phonemes:
+            phonemes = get_phonemes(sentence)
+        entry = self.cache.put_bytes(key, audio, self.tts_name, self.voice,
+                                     self.lang, self.audio_ext, phonemes)
+        return entry.path, phonemes
+
+    def render_tts(self, sentence):
+        """Synthesize a sentence with the voice effects applied.
+
+        Implemented by engines setting fuses_effects, which can apply the
+        effect chain as part of synthesis instead of in a second pass over
+        the get_tts output.
+
+        Args:
+            sentence (str): sentence to synthesize
+
+        Returns:
+            tuple: (audio bytes, phonemes)
+        """
+        raise NotImplementedError
+
+    def _cached(self, key):
+        """Return (wav_file, phonemes) from the cache, None on a miss."""
+        with self.timer("cache_lookup") as timer:
+            entry = self.cache.get(key)
+            timer.label(cache_hit=entry is not None)
+        if entry:
+            return entry.path, entry.phonemes
+        return None
+
+    def _cached_raw(self, key, sentence):
+        """Render cached raw audio with the effect chain, None on a miss.
+
+        With cache_raw set, audio cached before effects is rendered with the
+        current effect chain instead of being synthesized again.
+        """
+        if self.effects and self.cache_raw:
+            raw = self.cache.get(self.get_cache_key(sentence, raw=True))
+            if raw:
+                LOG.debug("TTS raw cache hit, applying effects")
+                return self._store(key, sentence, raw.path, raw.phonemes,
+                                   raw_cached=True)
+        return None
+
+    def _synthesis_path(self, key, sentence):
+        """Return the file the engine should write a chunk to."""
+        if self.effects and self.cache_raw:
+            key = self.get_cache_key(sentence, raw=True)
+        return self.cache.path_for(key, self.audio_ext)
+
+    def _store(self, key, sentence, wav_file, phonemes, raw_cached=False):
+        """Apply the voice effects to synthesized audio and cache it.
+
+        Args:
+            key (str): cache key of the chunk
+            sentence (str): synthesized chunk
+            wav_file (str): audio returned by the engine
+            phonemes: phonemes returned by the engine
+            raw_cached (bool): True if wav_file is already cached as raw
+                               audio
+
+        Returns:
+            tuple: (wav_file, phonemes)
+
+        Raises:
+            RuntimeError: wav_file is missing or empty
+        """
+        if not self.valid_audio(wav_file):
+            raise RuntimeError("{} synthesized no audio".format(
+                self.tts_name))
+        if not phonemes:
+            phonemes = get_phonemes(sentence)
+        if self.effects:
+            if self.cache_raw and not raw_cached:
+                self.cache.put(self.get_cache_key(sentence, raw=True),
+                               wav_file, self.tts_name, self.voice,
+                               self.lang, self.audio_ext, phonemes)
+            # the processed audio goes straight from memory into the cache
+            with self.timer("effects"):
+                audio = self.effects.render(wav_file)
+            entry = self.cache.put_bytes(key, audio, self.tts_name,
+                                         self.voice, self.lang,
+                                         self.audio_ext, phonemes)
+            return entry.path, phonemes
+        self.cache.put(key, wav_file, self.tts_name, self.voice,
+                       self.lang, self.audio_ext, phonemes)
+        return wav_file, phonemes
+
+    async def aget_tts(self, sentence, wav_file):
+        """Asynchronous get_tts.
+
+        Runs get_tts in the default executor, engines with non blocking
+        backends override this.
+
+        Args:
+            sentence (str): sentence to synthesize
+            wav_file (str): output file
+
+        Returns:
+            tuple: (wav_file, phonemes)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_tts, sentence,
+                                          wav_file)
+
+    async def asynthesize(self, sentence, priority=0):
+        """Asynchronous synthesize, see synthesize."""
+        key = self.get_cache_key(sentence)
+        cached = self._cached(key)
+        if cached:
+            return cached
+        return await self._flights.ado(key, self._asynthesize, key, sentence,
+                                       priority)
+
+    async def _asynthesize(self, key, sentence, priority=0):
+        entry = self.cache.get(key, count=False)
+        if entry:
+            return entry.path, entry.phonemes
+        loop = asyncio.get_running_loop()
+        if self.effects and self.cache_raw:
+            cached = await loop.run_in_executor(None, self._cached_raw, key,
+                                                sentence)
+            if cached:
+                return cached
+        ticket = await self._arate_limit(sentence, priority)
+        try:
+            if self._fused:
+                return await loop.run_in_executor(None, self._render, key,
+                                                  sentence)
+            path = self._synthesis_path(key, sentence)
+            tmp_path = self.cache.temp_path(path)
+            try:
+                with self.timer("get_tts"):
+                    wav_file, phonemes = await self.aget_tts(sentence,
+                                                             tmp_path)
+            except BaseException:
+                self._discard(tmp_path)
+                raise
+        finally:
+            if ticket is not None:
+                self.rate_limiter.release(ticket)
+        wav_file = self._commit(tmp_path, wav_file, path)
+        if self.effects:
+            # effects may fork sox, keep the event loop free
+            return await loop.run_in_executor(None, self._store, key,
+                                              sentence, wav_file, phonemes)
+        return self._store(key, sentence, wav_file, phonemes)
+
+    async def aexecute(self, sentence, ident=None, listen=False):
+        """Asynchronous execute, see execute.
+
+        Chunks are synthesized concurrently, pipeline_depth at a time,
+        and queued for playback in order.
+
+        Args:
+            sentence (str): sentence to be spoken
+            ident (str): id reference to current interaction
+            listen (bool): True if listen should be triggered at the end
+                           of the utterance.
+        """
+        create_signal("isSpeaking")
+        try:
+            await self._aexecute(sentence, ident, listen)
+        except Exception:
+            self.queue.put(EMPTY_PLAYBACK_QUEUE_TUPLE)
+            raise
+
+    async def _aexecute(self, sentence, ident=None, listen=False):
+        start = monotonic()
+        chunks = self.preprocess(sentence)
+        semaphore = asyncio.Semaphore(max(self.pipeline_depth, 1))
+
+        async def synth(idx, chunk):
+            async with semaphore:
+                return await self.asynthesize(chunk, priority=-idx)
+
+        tasks = [asyncio.ensure_future(synth(idx, chunk))
+                 for idx, chunk in enumerate(chunks)]
+        try:
+            for idx, task in enumerate(tasks):
+                wav_file, phonemes = await task
+                audio_ext, vis = self._playback_entry(wav_file, phonemes)
+                l = listen if idx == len(tasks) - 1 else False
+                self.queue.put((audio_ext, wav_file, vis, ident, l))
+                if idx == 0 and self.metrics is not None:
+                    self.metrics.observe("first_chunk", monotonic() - start,
+                                         engine=self.tts_name,
+                                         voice=self.voice)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stream_tts(self, sentence, chunk_size=4096):
+        """Synthesize a sentence, yielding audio as it becomes available.
+
+        The default implementation waits for get_tts and then reads the
+        file back, engines able to produce audio incrementally override
+        this to yield blocks as they arrive.
+
+        Args:
+            sentence (str): sentence to synthesize
+            chunk_size (int): maximum size of each yielded block
+
+        Yields:
+            bytes: blocks of the encoded audio file, in audio_ext format
+        """
+        fd, tmp_file = mkstemp(suffix="." + self.audio_ext)
+        os.close(fd)
+        wav_file = tmp_file
+        try:
+            wav_file, _ = self.get_tts(sentence, tmp_file)
+            with open(wav_file, "rb") as f:
+                yield from iter(lambda: f.read(chunk_size), b"")
+        finally:
+            for path in {tmp_file, wav_file}:
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    def synthesize_stream(self, sentence, chunk_size=4096):
+        """Yield the audio of a preprocessed chunk while caching it.
+
+        On a cache miss the blocks from stream_tts are written to the cache
+        entry as they are yielded, a player consuming this generator starts
+        with the first block while memory use stays bounded by chunk_size.
+        The entry is only committed once the stream completed, an abandoned
+        or failed stream caches nothing.
+
+        Cache hits are served by TTSCache.get_audio, from the memory tier
+        without reading the file when it holds the audio.
+
+        With voice effects the whole chunk is synthesized and processed
+        before the first block is yielded.
+
+        Args:
+            sentence (str): chunk to be synthesized
+            chunk_size (int): maximum size of each yielded block
+
+        Yields:
+            bytes: blocks of the encoded audio file, in audio_ext format
+        """
+        key = self.get_cache_key(sentence)
+        with self.timer("cache_lookup") as timer:
+            audio = self.cache.get_audio(key)
+            timer.label(cache_hit=audio is not None)
+        if audio is None and self.effects:
+            wav_file, _ = self.synthesize(sentence)
+            # rendered audio was put in the memory tier by the synthesis
+            audio = self.cache.get_audio(key, count=False)
+            if audio is None:
+                with open(wav_file, "rb") as f:
+                    yield from iter(lambda: f.read(chunk_size), b"")
+                return
+        if audio is not None:
+            for i in range(0, len(audio), chunk_size):
+                yield audio[i:i + chunk_size]
+            return
+
+        path = self._synthesis_path(key, sentence)
+        tmp_path = self.cache.temp_path(path)
+        size = 0
+        try:
+            with self.rate_limited(sentence), open(tmp_path, "wb") as f:
+                for data in self.stream_tts(sentence, chunk_size):
+                    f.write(data)
+                    size += len(data)
+                    yield data
+        except BaseException:
+            # includes GeneratorExit, the consumer stopped early
+            self._discard(tmp_path)
+            raise
+        if not size:
+            self._discard(tmp_path)
+            return
+        self._store(key, sentence, self._commit(tmp_path, tmp_path, path),
+                    None)
+
+    def cache_params(self):
+        """Engine settings that change the synthesized audio.
+
+        Engines keeping audio relevant state outside of their config
+        should override this so it becomes part of the cache key.
+
+        Returns:
+            dict: settings included in the cache key
+        """
+        return {k: v for k, v in self.config.items()
+                if k not in self.cache_ignored_config}
+
+    def get_cache_key(self, sentence, raw=False):
+        """Derive the cache key of a preprocessed sentence chunk.
+
+        Args:
+            sentence (str): chunk to be synthesized
+            raw (bool): key of the audio before voice effects are applied
+
+        Returns:
+            str: cache key
+        """
+        voice = self.voice or self.tts_name + "Default"
+        params = self.cache_params()
+        if self.effects and not raw:
+            params["effects"] = self.effects.fingerprint
+        return TTSCache.make_key(sentence, self.tts_name, voice, self.lang,
+                                 self.audio_ext, params)
+
+    def apply_voice_effects(self, wav_file, out_path=None):
+        """Apply the effect chain to an audio file.
+
+        Args:
+            wav_file (str): audio file
+            out_path (str): output path, defaults to overwriting wav_file
+
+        Returns:
+            str: path of the processed audio
+        """
+        return self.effects.apply(wav_file, out_path)
+
+    def cache_stats(self):
+        """Return the hit, miss and size counters of the cache.
+
+        Returns:
+            dict: see TTSCache.stats
+        """
+        return self.cache.stats()
 
     def clear_cache(self):
         """ Remove all cached files. """
-        if not os.path.exists(get_cache_directory('tts')):
-            return
-        for d in os.listdir(get_cache_directory("tts")):
-            dir_path = os.path.join(get_cache_directory("tts"), d)
-            if os.path.isdir(dir_path):
-                for f in os.listdir(dir_path):
-                    file_path = os.path.join(dir_path, f)
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-            # If no sub-folders are present, check if it is a file & clear it
-            elif os.path.isfile(dir_path):
-                os.unlink(dir_path)
+        # the base class calls this before the cache is created, entries
+        # are keyed by engine, voice and config so none can be stale then
+        if getattr(self, "cache", None) is not None:
+            self.cache.clear()
 
     def describe_voices(self):
         return {self.lang: [self.voice]}
 
+    @property
+    def http_session(self):
+        """Shared, connection pooling requests session for this engine."""
+        return transport.get_session(self.pool_size, self.retries,
+                                     self.backoff)
+
+    @property
+    def hedged_session(self):
+        """Shared session for requests sent through hedged_request.
+
+        Only connection errors are retried by the session, slow and failed
+        responses are covered by hedging and the request deadline.
+        """
+        return transport.get_session(self.pool_size, self.retries,
+                                     self.backoff, hedged=True)
+
+    @contextmanager
+    def rate_limited(self, sentence, priority=0):
+        """Hold a rate limiter admission while synthesizing a sentence.
+
+        Waits while the engine is over its configured request, character
+        or concurrency limits, a no-op without "rate_limit" config.
+
+        Args:
+            sentence (str): sentence about to be synthesized
+            priority (int): queue priority, higher goes first
+
+        Raises:
+            QueueTimeout: the sentence waited past the rate limit timeout
+        """
+        if self.rate_limiter is None:
+            yield
+            return
+        with self.timer("rate_limit"):
+            ticket = self.rate_limiter.acquire(len(sentence), priority)
+        try:
+            yield
+        finally:
+            self.rate_limiter.release(ticket)
+
+    async def _arate_limit(self, sentence, priority=0):
+        """Asynchronous rate_limited admission, release the ticket after."""
+        if self.rate_limiter is None:
+            return None
+        with self.timer("rate_limit"):
+            return await self.rate_limiter.aacquire(len(sentence), priority)
+
+    def hedged_request(self, send, deadline=None, idempotent=True):
+        """Send an http request with an adaptive deadline and hedging.
+
+        The deadline is derived from the latencies observed so far, capped
+        by the configured "timeout", and covers the request and its
+        duplicate. A duplicate request is sent if no response arrived after
+        the hedge_percentile latency, the first response received is used.
+        send should use hedged_session, which leaves retries of slow
+        responses to the hedge.
+
+        Args:
+            send (callable): send(timeout) performing the request and
+                             returning a requests.Response, timeout is the
+                             time left until the deadline
+            deadline (float): monotonic() time shared with earlier attempts
+                              of the same request, derived if None
+            idempotent (bool): False for requests that must not be sent
+                               twice, e.g. billed POSTs, they keep the
+                               deadline but are never duplicated
+
+        Returns:
+            requests.Response: first response received
+
+        Raises:
+            requests.Timeout: the deadline passed without a response
+        """
+        if deadline is None:
+            deadline = monotonic() + self.latency.deadline(self.timeout)
+
+        def attempt():
+            start = monotonic()
+            if start >= deadline:
+                raise requests.Timeout("request deadline exceeded")
+            response = send(deadline - start)
+            if response.status_code < 500:
+                self.latency.record(monotonic() - start)
+            return response
+
+        delay = None
+        if self.hedge and idempotent:
+            delay = self.latency.percentile(self.hedge_percentile)
+        return transport.hedge(attempt, delay, deadline)
+
+    def get_endpoints(self, urls, api_path=""):
+        """Build the pool balancing requests over the servers of an engine.
+
+        Args:
+            urls (str|list): base url or list of base urls
+            api_path (str): path stripped from urls that include it
+
+        Returns:
+            transport.EndpointPool: the endpoints
+        """
+        if isinstance(urls, str):
+            urls = [urls]
+        endpoints = []
+        for url in urls or []:
+            url = remove_last_slash(url)
+            if api_path and url.endswith(api_path):
+                url = url[:-len(api_path)]
+            endpoints.append(url)
+        return transport.EndpointPool(endpoints, self.failure_threshold,
+                                      self.reset_timeout)
+
+    async def get_aiohttp_session(self):
+        """Return an aiohttp session bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        session = self._aiohttp_session
+        if session is None or session.closed or \
+                self._aiohttp_loop is not loop:
+            self._close_aiohttp_session()
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            session = self._aiohttp_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._aiohttp_loop = loop
+        return session
+
+    def _close_aiohttp_session(self):
+        """Close the aiohttp session on the event loop it was created in."""
+        session, loop = self._aiohttp_session, self._aiohttp_loop
+        self._aiohttp_session = self._aiohttp_loop = None
+        if session is None or session.closed:
+            return
+        if loop.is_closed():
+            # its connections can not be closed anymore
+            session.detach()
+        elif loop.is_running() or asyncio._get_running_loop() is not None:
+            # closed once that loop runs
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            loop.run_until_complete(session.close())
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if getattr(self, "_aiohttp_session", None) is not None:
+            self._close_aiohttp_session()
+        super().stop()
+
 
 class TTSValidator(_TTSValidator):
     """
@@ -152,6 +871,8 @@ class TTSValidator(_TTSValidator):
 
 
 class ConcatTTS(TTS):
+    fuses_effects = True
+
     def __init__(self, config=None, timestep=0.1):
         config = config or {"lang": "en-us"}
         super(ConcatTTS, self).__init__(config, ConcatTTSValidator(self))
@@ -161,32 +882,38 @@ class ConcatTTS(TTS):
         self.sound_files_path = self.config.get("sounds")
         self.channels = self.config.get("channels", "1")
         self.rate = self.config.get("rate", "16000")
+        # units are decoded and converted once, not on every utterance
+        self.inventory = UnitInventory(self.sound_files_path, self.rate,
+                                       self.channels)
+        self.unit_index = UnitIndex(self.load_units())
+
+    def load_units(self):
+        """ return the units of the voice, {unit text: unit file}
+
+        by default the unit text is the file name of every file in the
+        inventory, e.g. "good_morning.wav" speaks "good morning" """
+        return {unit_text(path): path for path in self.inventory}
 
     def sentence_to_files(self, sentence):
         """ select files to concatonate to form input sentence
         return files (list) , phonemes (list)
-        """
-        return [], None
+
+        units are selected by greedy longest match over the words of the
+        sentence, words no unit covers are skipped """
+        files, spoken = self.unit_index.select(sentence)
+        if not files:
+            return [], None
+        return list(files), get_phonemes(spoken)
+
+    def concat_audio(self, files):
+        """ generate wav audio from input files, separated by time_step
+        seconds of silence """
+        return self.inventory.concat(files, self.time_step)
 
     def concat(self, files, wav_file):
         """ generate output wav file from input files """
-        cmd = ["sox"]
-        for file in files:
-            if not isfile(file):
-                continue
-            cmd.append("-c")
-            cmd.append(self.channels)
-            cmd.append("-r")
-            cmd.append(self.rate)
-            cmd.append(file)
-
-        cmd.append(wav_file)
-        cmd.append("channels")
-        cmd.append(self.channels)
-        cmd.append("rate")
-        cmd.append(self.rate)
-        LOG.info(subprocess.check_output(cmd))
-
+        with open(wav_file, "wb") as f:
+            f.write(self.concat_audio(files))
         return wav_file
 
     def get_tts(self, sentence, wav_file):
@@ -204,6 +931,13 @@ class ConcatTTS(TTS):
         wav_file = self.concat(files, wav_file)
         return wav_file, phonemes
 
+    def render_tts(self, sentence):
+        """ concatenate units in memory and apply the voice effects,
+        without intermediate files """
+        files, phonemes = self.sentence_to_files(sentence)
+        audio = self.effects.render_audio(self.concat_audio(files))
+        return audio, phonemes
+
 
 class ConcatTTSValidator(TTSValidator):
     def __init__(self, tts):
@@ -233,25 +967,85 @@ class RemoteTTS(TTS):
         super(RemoteTTS, self).__init__(config, validator)
         self.api_path = api_path or config.get("api_path", "")
         self.auth = None
-        url = url or config.get("url")
-        self.url = remove_last_slash(url)
-        self.session = FuturesSession()
+        # "url" may also be a list, or servers listed under "urls"
+        urls = url or config.get("urls") or config.get("url")
+        self.endpoints = self.get_endpoints(urls, self.api_path)
+        self.url = self.endpoints.urls[0]
+        self.session = FuturesSession(session=self.http_session)
 
     def build_request_params(self, sentence):
         pass
 
-    def get_tts(self, sentence, wav_file):
+    def _request(self, sentence, stream=False):
         sentence = self.validate_ssml(sentence)
-        resp = self.session.get(
-            self.url + self.api_path, params=self.build_request_params(sentence),
-            timeout=10, verify=False, auth=self.auth).result()
-        if resp.status_code == 200:
-            with open(wav_file, 'wb') as f:
-                f.write(resp.content)
-        else:
-            LOG.error(
-                '%s Http Error: %s for url: %s' %
-                (resp.status_code, resp.reason, resp.url))
+        params = self.build_request_params(sentence)
+        # a hedged duplicate goes to the least busy endpoint, usually
+        # another one than the slow request
+        return self.hedged_request(
+            lambda timeout: self.endpoints.request(
+                lambda url, left: self.hedged_session.get(
+                    url + self.api_path, params=params, timeout=left,
+                    verify=False, auth=self.auth, stream=stream),
+                timeout))
+
+    def get_tts(self, sentence, wav_file, chunk_size=4096):
+        resp = self._request(sentence, stream=True)
+        with resp:
+            if resp.status_code == 200:
+                # written block by block, never held in memory as a whole
+                with open(wav_file, 'wb') as f:
+                    for data in resp.iter_content(chunk_size):
+                        f.write(data)
+            else:
+                LOG.error(
+                    '%s Http Error: %s for url: %s' %
+                    (resp.status_code, resp.reason, resp.url))
+                raise RuntimeError(
+                    "{} returned no audio".format(self.tts_name))
+        return wav_file, None
+
+    def stream_tts(self, sentence, chunk_size=4096):
+        resp = self._request(sentence, stream=True)
+        with resp:
+            if resp.status_code != 200:
+                LOG.error(
+                    '%s Http Error: %s for url: %s' %
+                    (resp.status_code, resp.reason, resp.url))
+                return
+            for data in resp.iter_content(chunk_size):
+                if data:
+                    yield data
+
+    async def aget_tts(self, sentence, wav_file):
+        if aiohttp is None:
+            return await super().aget_tts(sentence, wav_file)
+        sentence = self.validate_ssml(sentence)
+        params = {k: v.decode("utf-8") if isinstance(v, bytes) else str(v)
+                  for k, v in self.build_request_params(sentence).items()}
+        auth = None
+        if self.auth:
+            auth = aiohttp.BasicAuth(self.auth.username, self.auth.password)
+        session = await self.get_aiohttp_session()
+        endpoint = self.endpoints.acquire()
+        ok = False
+        try:
+            async with session.get(endpoint.url + self.api_path,
+                                   params=params, auth=auth,
+                                   ssl=False) as resp:
+                ok = resp.status < 500
+                if resp.status == 200:
+                    with open(wav_file, 'wb') as f:
+                        async for data in resp.content.iter_chunked(4096):
+                            f.write(data)
+                else:
+                    LOG.error(
+                        '%s Http Error: %s for url: %s' %
+                        (resp.status, resp.reason, resp.url))
+                    raise RuntimeError(
+                        "{} returned no audio".format(self.tts_name))
+        finally:
+            self.endpoints.release(endpoint, ok)
+        return wav_file, None
 
 
 class TTSMutator:
@@ -260,70 +1054,38 @@ class TTSMutator:
         self.sound_file = sound_file
         self.effects = ["sox", sound_file, sound_file]
 
+    # effect name -> method building its sox arguments
+    EFFECTS = ("pitch", "phaser", "flanger", "reverb", "tempo", "treble",
+               "tremolo", "reverse", "speed", "chorus", "echo", "bend",
+               "stretch", "overdrive", "bass", "allpass", "bandpass",
+               "bandreject", "compand", "contrast", "equalizer", "gain",
+               "highpass", "lowpass", "loudness", "noisered")
+
     def apply(self, save=True):
-        if len(list(self.config.keys())):
-            for effect in self.config:
-                params = self.config[effect]
-                if effect == "pitch":
-                    self.pitch(**params)
-                elif effect == "phaser":
-                    self.phaser(**params)
-                elif effect == "flanger":
-                    self.flanger(**params)
-                elif effect == "reverb":
-                    self.reverb(**params)
-                elif effect == "tempo":
-                    self.tempo(**params)
-                elif effect == "treble":
-                    self.treble(**params)
-                elif effect == "tremolo":
-                    self.tremolo(**params)
-                elif effect == "reverse":
-                    self.reverse()
-                elif effect == "speed":
-                    self.speed(**params)
-                elif effect == "chorus":
-                    self.chorus(**params)
-                elif effect == "echo":
-                    self.echo(**params)
-                elif effect == "bend":
-                    self.bend(**params)
-                elif effect == "stretch":
-                    self.stretch(**params)
-                elif effect == "overdrive":
-                    self.overdrive(**params)
-                elif effect == "bass":
-                    self.bass(**params)
-                elif effect == "allpass":
-                    self.allpass(**params)
-                elif effect == "bandpass":
-                    self.bandpass(**params)
-                elif effect == "bandreject":
-                    self.bandreject(**params)
-                elif effect == "compand":
-                    self.compand(**params)
-                elif effect == "contrast":
-                    self.contrast(**params)
-                elif effect == "equalizer":
-                    self.equalizer(**params)
-                elif effect == "gain":
-                    self.gain(**params)
-                elif effect == "highpass":
-                    self.highpass(**params)
-                elif effect == "lowpass":
-                    self.lowpass(**params)
-                elif effect == "loudness":
-                    self.loudness(**params)
-                elif effect == "noisered":
-                    self.noisered(**params)
-            if save:
-                self.save()
+        for effect, params in self.config.items():
+            if effect not in self.EFFECTS:
+                raise ValueError("unknown effect: {}".format(effect))
+            getattr(self, effect)(**(params or {}))
+        if self.config and save:
+            self.save()
 
     def save(self, out_path=None):
         out_path = out_path or self.sound_file
         self.effects[2] = out_path
-        subprocess.call(self.effects, stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT)
+        if out_path != self.sound_file:
+            subprocess.call(self.effects, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+            return out_path
+        # sox can not read and write the same file, pipe through memory
+        ext = self.sound_file.rsplit(".", 1)[-1]
+        try:
+            audio = SoxCommand(ext).add_input(self.sound_file) \
+                .add_effects(*self.effects[3:]).run()
+        except subprocess.CalledProcessError as e:
+            LOG.error("sox failed: {}".format(e))
+            return out_path
+        with open(out_path, "wb") as f:
+            f.write(audio)
         return out_path
 
     def pitch(self, n_semitones, quick=False):
@@ -1290,3 +2052,146 @@ class TTSMutator:
             '{:f}'.format(amount)
         ]
         self.effects.extend(effect_args)
+
+
+class EffectChain:
+    """Validated, immutable voice effects configuration.
+
+    The effects config is checked and converted to sox arguments once, the
+    chain is then applied to every utterance without re-parsing it.
+
+    Args:
+        effects (dict): effect name -> parameters, see TTSMutator
+        backend (str): "auto" applies effects in process when possible,
+                       "sox" always runs sox, as do wav formats the in
+                       process backend can not read
+
+    Raises:
+        ValueError: unknown effect, backend or invalid effect parameters
+    """
+    BACKENDS = ("auto", "sox")
+
+    def __init__(self, effects=None, backend="auto"):
+        if backend not in self.BACKENDS:
+            raise ValueError("unknown effects backend: {}".format(backend))
+        effects = effects or {}
+        mutator = TTSMutator(None, effects)
+        try:
+            mutator.apply(save=False)
+        except TypeError as e:
+            raise ValueError("invalid effect parameters: {}".format(e))
+        self._config = MappingProxyType(
+            {name: MappingProxyType(dict(params or {}))
+             for name, params in effects.items()})
+        # skip "sox infile outfile"
+        self._sox_args = tuple(mutator.effects[3:])
+        self._backend = backend
+        self._in_process = backend != "sox" and dsp.supports(effects)
+        # the in process backend does not render exactly like sox
+        self._fingerprint = hashlib.md5(json.dumps(
+            [effects, "dsp" if self._in_process else "sox"],
+            sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def sox_args(self):
+        return self._sox_args
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def fingerprint(self):
+        """Digest identifying the audio this chain renders."""
+        return self._fingerprint
+
+    def __bool__(self):
+        return bool(self._config)
+
+    def __len__(self):
+        return len(self._config)
+
+    def __repr__(self):
+        return "EffectChain({})".format(list(self._config))
+
+    def sox_command(self, in_path, out_path=None):
+        """Return the sox command line applying this chain."""
+        return ["sox", in_path, out_path or in_path] + list(self._sox_args)
+
+    def apply(self, path, out_path=None):
+        """Apply the chain to an audio file.
+
+        Args:
+            path (str): input audio file
+            out_path (str): output path, defaults to overwriting path
+
+        Returns:
+            str: output path
+        """
+        if not self._config:
+            return path
+        out_path = out_path or path
+        if self._in_process and path.endswith(".wav"):
+            try:
+                return dsp.apply_effects(path, self._config, out_path)
+            except dsp.UnsupportedAudio:
+                pass
+        if out_path != path:
+            return self.sox(path).run_to_file(out_path)
+        # sox can not read and write the same file, go through memory
+        audio = self.render(path)
+        with open(out_path, "wb") as f:
+            f.write(audio)
+        return out_path
+
+    def sox(self, path, audio_ext=None):
+        """Return a SoxCommand applying this chain to an audio file.
+
+        Args:
+            path (str): input audio file, "-" to pipe it over stdin
+            audio_ext (str): audio format, defaults to the path extension
+
+        Returns:
+            SoxCommand: command, more inputs or effects can still be added
+        """
+        audio_ext = audio_ext or path.rsplit(".", 1)[-1]
+        cmd = SoxCommand(audio_ext)
+        cmd.add_input(path, file_type=audio_ext if path == "-" else None)
+        return cmd.add_effects(*self._sox_args)
+
+    def render(self, path):
+        """Apply the chain to an audio file, returning the processed audio.
+
+        Args:
+            path (str): input audio file
+
+        Returns:
+            bytes: processed audio, in the format of the input
+        """
+        if self._in_process and path.endswith(".wav"):
+            try:
+                return dsp.render_effects(path, self._config)
+            except dsp.UnsupportedAudio:
+                pass
+        return self.sox(path).run()
+
+    def render_audio(self, audio, audio_ext="wav"):
+        """Apply the chain to audio held in memory.
+
+        Args:
+            audio (bytes): audio file contents
+            audio_ext (str): audio format
+
+        Returns:
+            bytes: processed audio
+        """
+        if self._in_process and audio_ext == "wav":
+            try:
+                return dsp.render_effects(io.BytesIO(audio), self._config)
+            except dsp.UnsupportedAudio:
+                pass
+        return self.sox("-", audio_ext).run(audio)
@@ -1,5 +1,6 @@
 import subprocess
 from text2speech.modules import TTS, TTSValidator
+from text2speech.util import run_subprocess
 
 
 class ESpeak(TTS):
@@ -32,13 +33,29 @@ class ESpeak(TTS):
                 tag = tag.replace(val, new_val)
         return tag
 
+    @property
+    def args(self):
+        return ['espeak', '-m', '-v', self.lang + '+' + self.voice]
+
     def get_tts(self, sentence, wav_file):
-        subprocess.call(
-            ['espeak', '-m', "-w", wav_file, '-v', self.lang + '+' +
-             self.voice, sentence])
+        subprocess.call(self.args + ["-w", wav_file, sentence])
+        return wav_file, None
 
+    async def aget_tts(self, sentence, wav_file):
+        await run_subprocess(self.args + ["-w", wav_file, sentence])
         return wav_file, None
 
+    def stream_tts(self, sentence, chunk_size=4096):
+        process = subprocess.Popen(self.args + ["--stdout", sentence],
+                                   stdout=subprocess.PIPE)
+        try:
+            yield from iter(lambda: process.stdout.read(chunk_size), b"")
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
     def describe_voices(self):
         output = subprocess.check_output(["espeak", "--voices"]).decode(
             "utf-8")
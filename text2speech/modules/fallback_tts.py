@@ -0,0 +1,218 @@
+import asyncio
+import shutil
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from time import monotonic
+
+from ovos_utils.log import LOG
+from text2speech.modules import TTS, TTSValidator
+
+
+class FallbackTTS(TTS):
+    """Engine speaking through the first of several engines that delivers.
+
+    The preferred engine is tried first, if it has not produced audio
+    within the latency budget the next engine is started, and so on. With
+    "race" enabled the engines already running keep competing and the
+    first valid audio wins, otherwise a late result from an engine whose
+    budget expired is not waited for. Abandoned syntheses still complete
+    in the background, so their audio is cached for the next time.
+
+    Every engine caches under its own cache key, a sentence already cached
+    by any engine is served immediately, preferring earlier engines. SSML
+    and phonetic spellings are handled by each engine, as if it was
+    speaking on its own.
+
+        "fallback": {
+            "engines": [{"module": "polly", "voice": "Joanna"},
+                        {"module": "mimic", "budget": 3},
+                        {"module": "espeak"}],
+            "budget": 1.5,
+            "race": false
+        }
+
+    Args:
+        config (dict): engine configs in order of preference, the default
+                       budget in seconds and the race flag
+    """
+    works_offline = False
+    # results produced by the engines, to queue them with the right format
+    # and visemes
+    MAX_PRODUCERS = 256
+
+    def __init__(self, config=None):
+        config = config or {"lang": "en-us",
+                            "engines": [{"module": "espeak"}]}
+        super(FallbackTTS, self).__init__(config, FallbackTTSValidator(self))
+        self.budget = float(config.get("budget", 2.0))
+        self.race = config.get("race", False)
+        self.engines = []
+        self.budgets = []
+        for engine_config in config.get("engines", []):
+            engine_config = dict(engine_config)
+            module = engine_config.pop("module")
+            budget = float(engine_config.pop("budget", self.budget))
+            engine_config.setdefault("lang", self.lang)
+            try:
+                engine = self.create_engine(module, engine_config)
+            except Exception:
+                LOG.exception("Failed to load fallback engine: " + module)
+                continue
+            self.engines.append(engine)
+            self.budgets.append(budget)
+        if not self.engines:
+            raise ValueError("no fallback engine could be loaded")
+        self.audio_ext = self.engines[0].audio_ext
+        self.filename = self.engines[0].filename
+        self.voice = self.voice or self.engines[0].voice
+        self.works_offline = any(e.works_offline for e in self.engines)
+        self._producers = OrderedDict()
+        self._producers_lock = Lock()
+        # one executor per engine, a fallback never waits for workers busy
+        # with syntheses abandoned by an earlier engine
+        self._executors = [
+            ThreadPoolExecutor(max_workers=engine.pool_size,
+                               thread_name_prefix="TTSFallback")
+            for engine in self.engines]
+
+    @staticmethod
+    def create_engine(module, config):
+        from text2speech import TTSFactory
+        return TTSFactory.create({"module": module, module: config})
+
+    def _produced(self, engine, result):
+        with self._producers_lock:
+            self._producers[result[0]] = engine
+            self._producers.move_to_end(result[0])
+            while len(self._producers) > self.MAX_PRODUCERS:
+                self._producers.popitem(last=False)
+        return result
+
+    def _playback_entry(self, wav_file, phonemes):
+        with self._producers_lock:
+            engine = self._producers.get(wav_file)
+        if engine is None:
+            return super()._playback_entry(wav_file, phonemes)
+        with self.timer("viseme"):
+            vis = engine.viseme(phonemes) if phonemes else None
+        return engine.audio_ext, vis
+
+    def synthesize(self, sentence, priority=0):
+        """Get the audio of a chunk from the first engine delivering it.
+
+        Args:
+            sentence (str): chunk to be synthesized
+            priority (int): rate limit queue priority, higher goes first
+
+        Returns:
+            tuple: (wav_file, phonemes)
+        """
+        prepared = [engine._prepare_sentence(sentence)
+                    for engine in self.engines]
+        for engine, text in zip(self.engines, prepared):
+            cached = engine._cached(engine.get_cache_key(text))
+            if cached and self.valid_audio(cached[0]):
+                return self._produced(engine, cached)
+
+        engines = iter(zip(self.engines, self.budgets, prepared,
+                           self._executors))
+        running = {}
+        # engines over budget, only waited for once every engine failed
+        abandoned = {}
+        error = None
+        deadline = None
+        while True:
+            now = monotonic()
+            if not running or (deadline is not None and now >= deadline):
+                engine, budget, text, executor = next(engines,
+                                                      (None,) * 4)
+                if engine is not None:
+                    if not self.race:
+                        abandoned.update(running)
+                        running.clear()
+                    future = executor.submit(engine.synthesize, text,
+                                             priority)
+                    running[future] = engine
+                    deadline = now + budget
+                else:
+                    deadline = None
+                    if not running:
+                        running, abandoned = abandoned, {}
+                if not running:
+                    break
+            timeout = None if deadline is None else max(deadline - now, 0)
+            done, _ = wait(list(running), timeout=timeout,
+                           return_when=FIRST_COMPLETED)
+            # prefer earlier engines among results arriving together
+            for future in sorted(done, key=lambda f: self.engines.index(
+                    running[f])):
+                engine = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    LOG.warning("{} failed: {}".format(engine.tts_name, e))
+                    error = e
+                    continue
+                if result and self.valid_audio(result[0]):
+                    return self._produced(engine, result)
+                LOG.warning("{} produced no audio".format(engine.tts_name))
+        raise error or RuntimeError("no fallback engine produced audio")
+
+    async def asynthesize(self, sentence, priority=0):
+        """Asynchronous synthesize, see synthesize."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.synthesize, sentence,
+                                          priority)
+
+    def get_tts(self, sentence, wav_file):
+        path, phonemes = self.synthesize(sentence)
+        shutil.copyfile(path, wav_file)
+        return wav_file, phonemes
+
+    def synthesize_stream(self, sentence, chunk_size=4096):
+        wav_file, _ = self.synthesize(sentence)
+        with open(wav_file, "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+
+    def preprocess(self, sentence):
+        # ssml and phonetic spellings are applied by each engine
+        with self.timer("chunking"):
+            return self._preprocess_sentence(sentence)
+
+    def get_cache_key(self, sentence, raw=False):
+        engine = self.engines[0]
+        return engine.get_cache_key(engine._prepare_sentence(sentence), raw)
+
+    def clear_cache(self):
+        for engine in getattr(self, "engines", []):
+            engine.clear_cache()
+
+    def describe_voices(self):
+        return self.engines[0].describe_voices()
+
+    def stop(self):
+        for executor in getattr(self, "_executors", []):
+            executor.shutdown(wait=False)
+        self._executors = []
+        for engine in getattr(self, "engines", []):
+            engine.stop()
+        super().stop()
+
+
+class FallbackTTSValidator(TTSValidator):
+    def __init__(self, tts):
+        super(FallbackTTSValidator, self).__init__(tts)
+
+    def validate_lang(self):
+        # every engine was validated when it was created
+        pass
+
+    def validate_voice(self):
+        pass
+
+    def validate_connection(self):
+        pass
+
+    def get_tts_class(self):
+        return FallbackTTS
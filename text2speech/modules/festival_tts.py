@@ -1,5 +1,6 @@
 import subprocess
 from text2speech.modules import TTS, TTSValidator
+from text2speech.util import run_subprocess
 
 
 class FestivalTTS(TTS):
@@ -14,6 +15,11 @@ class FestivalTTS(TTS):
             utt=sentence, wave=wav_file), shell=True)
         return wav_file, None
 
+    async def aget_tts(self, sentence, wav_file):
+        await run_subprocess(["text2wave", "-o", wav_file],
+                             (sentence + "\n").encode("utf-8"))
+        return wav_file, None
+
     def describe_voices(self):
         voices = {}  # TODO
         return voices
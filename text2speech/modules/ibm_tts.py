@@ -14,8 +14,6 @@ class WatsonTTS(RemoteTTS):
         user = self.config.get("user") or self.config.get("username")
         password = self.config.get("password")
         api_key = self.config.get("apikey")
-        if self.url.endswith(self.api_path):
-            self.url = self.url[:-len(self.api_path)]
 
         if api_key is None:
             self.auth = HTTPBasicAuth(user, password)
@@ -38,8 +36,9 @@ class WatsonTTS(RemoteTTS):
 
     def describe_voices(self):
         if self._voices is None:
-            data = self.session.get(self.url + "/v1/voices",
-                                    auth=self.auth).result().json()
+            data = self.endpoints.request(lambda url: self.session.get(
+                url + "/v1/voices", auth=self.auth,
+                timeout=self.timeout).result()).json()
             self._voices = data
         else:
             data = self._voices
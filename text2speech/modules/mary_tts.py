@@ -1,5 +1,3 @@
-import requests
-
 from text2speech.modules import RemoteTTS, TTSValidator
 
 
@@ -32,10 +30,12 @@ class MaryTTS(RemoteTTS):
 
     def describe_voices(self):
         voices = {}
-        locales = requests.get(self.url + "/locales").text.split()
+        locales = self.http_session.get(self.url + "/locales",
+                                        timeout=self.timeout).text.split()
         for l in locales:
             voices[l] = []
-        voice_data = requests.get(self.url + "/voices").text.split("\n")
+        voice_data = self.http_session.get(
+            self.url + "/voices", timeout=self.timeout).text.split("\n")
         for v in voice_data:
             if not v.strip():
                 continue
@@ -50,7 +50,9 @@ class MaryTTSValidator(TTSValidator):
 
     def validate_connection(self):
         try:
-            resp = requests.get(self.tts.url + "/version", verify=False)
+            resp = self.tts.http_session.get(self.tts.url + "/version",
+                                             verify=False,
+                                             timeout=self.tts.timeout)
             if not resp.text.startswith("Mary TTS server"):
                 raise Exception('Invalid MaryTTS server.')
         except:
@@ -3,16 +3,19 @@ from ovos_utils.log import LOG
 from text2speech.visimes import VISIMES
 from text2speech.util import get_cache_directory
 from ovos_utils.sound import play_wav
-from requests_futures.sessions import FuturesSession
 from requests.exceptions import (
-    ReadTimeout, ConnectionError, ConnectTimeout, HTTPError
+    ReadTimeout, ConnectionError, HTTPError, Timeout
 )
 from urllib import parse
 import math
 import base64
+import io
 import os
 import re
 import json
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
 
 max_sentence_size = 170
 
@@ -157,13 +160,22 @@ def sentence_chunker(text, chunk_size, split_by_punc=True):
 
 class Mimic2(TTS):
     works_offline = False
+    cache_ignored_config = TTS.cache_ignored_config + ["chunk_retries"]
 
     def __init__(self, config=None):
         config = config or {"lang": "en-us", "voice": "kusal"}
         super(Mimic2, self).__init__(config, Mimic2Validator(self))
         self.url = config.get('url',
                               "https://mimic-api.mycroft.ai/synthesize?text=")
-        self.session = FuturesSession()
+        self.timeout = config.get("timeout", 5)
+        # every chunk of an utterance is requested at once, one worker per
+        # pooled connection
+        self._chunk_executor = ThreadPoolExecutor(
+            max_workers=self.pool_size, thread_name_prefix="Mimic2")
+        # attempts of a failed chunk on its own, after the first request,
+        # none by default within a rate limit
+        self.chunk_retries = config.get(
+            "chunk_retries", 2 if self.rate_limiter is None else 0)
         chunk_size = config.get('chunk_size')
         self.chunk_size = \
             chunk_size if chunk_size is not None else 10
@@ -193,23 +205,108 @@ class Mimic2(TTS):
                 '%s Http Error: %s for url: %s' %
                 (req.status_code, req.reason, req.url))
 
-    def _requests(self, chunks):
+    def _requests(self, chunks, deadline):
         """create asynchronous request list
 
         Args:
             chunks (list): list of text to synthesize
+            deadline (float): monotonic() time the chunks must answer by
 
         Returns:
-            list: list of FutureSession objects
+            list: futures of the (wav audio, visimes) of each chunk
         """
         reqs = []
         for chunk in chunks:
             if len(chunk) > 0:
-                url = self.url + parse.quote(chunk)
-                req_route = url + "&visimes=True"
-                reqs.append(self.session.get(req_route, timeout=5))
+                reqs.append(self._chunk_executor.submit(self._request,
+                                                        chunk, deadline))
         return reqs
 
+    def _request(self, chunk, deadline=None):
+        """synthesize a chunk
+
+        Args:
+            chunk (str): text to synthesize
+            deadline (float): monotonic() time shared by the attempts of
+                              the chunk
+
+        Returns:
+            tuple: (wav audio, visimes) of the chunk
+        """
+        url = self.url + parse.quote(chunk) + "&visimes=True"
+        req = self.hedged_request(
+            lambda timeout: self.hedged_session.get(url, timeout=timeout),
+            deadline)
+        req.raise_for_status()
+        results = req.json()
+        return base64.b64decode(results['audio_base64']), results['visimes']
+
+    def _chunk_result(self, req, chunk, deadline):
+        """wait for a chunk, retrying it on its own if it failed
+
+        Args:
+            req (Future): pending request of the chunk
+            chunk (str): text of the chunk
+            deadline (float): monotonic() time the retries must answer by
+
+        Returns:
+            tuple: (wav audio, visimes) of the chunk
+        """
+        for attempt in range(self.chunk_retries + 1):
+            if attempt and monotonic() >= deadline:
+                break
+            try:
+                if attempt:
+                    return self._request(chunk, deadline)
+                return req.result()
+            except (Timeout, ConnectionError, HTTPError, KeyError,
+                    ValueError) as e:
+                LOG.warning("Mimic2 chunk failed ({}): {}".format(e, chunk))
+                error = e
+        raise error
+
+    @staticmethod
+    def _merge(results, wav_file):
+        """join chunk audio in order into a single wav file
+
+        PCM frames are concatenated in memory and the header is written
+        once, visime timestamps are offset by the duration of the audio
+        preceding their chunk.
+
+        Args:
+            results (list): (wav audio, visimes) of each chunk, in order
+            wav_file (str): output file
+
+        Returns:
+            list: visimes of the whole utterance
+        """
+        frames = []
+        visimes = []
+        params = None
+        offset = 0.0
+        for audio, vis in results:
+            with wave.open(io.BytesIO(audio), "rb") as f:
+                if params is None:
+                    params = f.getparams()
+                elif (f.getnchannels(), f.getsampwidth(),
+                      f.getframerate()) != params[:3]:
+                    raise ValueError("Mimic2 chunks differ in audio format")
+                n_frames = f.getnframes()
+                frames.append(f.readframes(n_frames))
+                duration = n_frames / f.getframerate()
+            visimes += [(phone, float(time) + offset)
+                        for phone, time in vis or []]
+            offset += duration
+        data = b"".join(frames)
+        with wave.open(wav_file, "wb") as f:
+            f.setnchannels(params.nchannels)
+            f.setsampwidth(params.sampwidth)
+            f.setframerate(params.framerate)
+            # frame count known upfront, the header is not patched on close
+            f.setnframes(len(data) // (params.nchannels * params.sampwidth))
+            f.writeframes(data)
+        return visimes
+
     def visime(self, phonemes):
         """maps phonemes to visemes encoding
 
@@ -268,25 +365,39 @@ class Mimic2(TTS):
 
         # Use the phonetic_spelling mechanism from the TTS base class
         if self.phonetic_spelling:
-            for word in re.findall(r"[\w']+", sentence):
-                if word.lower() in self.spellings:
-                    sentence = sentence.replace(word,
-                                                self.spellings[word.lower()])
-
-        chunks = sentence_chunker(sentence, self.chunk_size)
+            sentence = self.spellings.apply(sentence)
+
+        chunks = [chunk for chunk in
+                  sentence_chunker(sentence, self.chunk_size) if chunk]
+        # all chunks are requested concurrently and joined in order, with
+        # one deadline for the utterance, retries included
+        deadline = monotonic() + self.latency.deadline(self.timeout)
+        reqs = self._requests(chunks, deadline)
         try:
-            for idx, req in enumerate(self._requests(chunks)):
-                results = req.result().json()
-                audio = base64.b64decode(results['audio_base64'])
-                vis = results['visimes']
-                with open(wav_file, 'wb') as f:
-                    f.write(audio)
-        except (ReadTimeout, ConnectionError, ConnectTimeout, HTTPError) as e:
+            results = [self._chunk_result(req, chunk, deadline)
+                       for req, chunk in zip(reqs, chunks)]
+            if not results:
+                return (wav_file, None)
+            vis = self._merge(results, wav_file)
+        except (Timeout, ConnectionError, HTTPError) as e:
             raise ReadTimeout(
                 "Mimic 2 remote server request timedout"
             )
+        except (KeyError, ValueError, wave.Error, EOFError) as e:
+            raise ReadTimeout(
+                "Mimic 2 remote server returned an invalid response"
+            ) from e
+        finally:
+            for req in reqs:
+                req.cancel()
         return (wav_file, vis)
 
+    def viseme(self, phonemes):
+        # phonemes guessed from the text when the server sent no visimes
+        if isinstance(phonemes, str):
+            return super().viseme(phonemes)
+        return self.visime(phonemes)
+
     def save_phonemes(self, key, phonemes):
         """
             Cache phonemes
@@ -324,6 +435,12 @@ class Mimic2(TTS):
     def describe_voices(self):
         return {"en": ["kusal"]}
 
+    def stop(self):
+        if getattr(self, "_chunk_executor", None) is not None:
+            self._chunk_executor.shutdown(wait=False)
+            self._chunk_executor = None
+        super().stop()
+
 
 class Mimic2Validator(TTSValidator):
 
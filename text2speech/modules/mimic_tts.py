@@ -1,6 +1,7 @@
 import subprocess
 from text2speech.visimes import VISIMES
 from text2speech.modules import TTS, TTSValidator
+from text2speech.util import run_subprocess
 from ovos_utils.log import LOG
 import distutils.spawn
 
@@ -15,7 +16,6 @@ class Mimic(TTS):
         super(Mimic, self).__init__(config, MimicValidator(self),
             ssml_tags=["speak", "ssml", "phoneme", "voice", "audio", "prosody"]
         )
-        self.clear_cache()
 
     def modify_tag(self, tag):
         for key, value in [
@@ -49,6 +49,11 @@ class Mimic(TTS):
                                                         '-t', sentence])
         return wav_file, phonemes.decode()
 
+    async def aget_tts(self, sentence, wav_file):
+        phonemes = await run_subprocess(self.args + ['-o', wav_file,
+                                                     '-t', sentence])
+        return wav_file, phonemes.decode()
+
     def visime(self, output):
         visimes = []
         pairs = str(output).split(" ")
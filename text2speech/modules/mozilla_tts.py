@@ -1,5 +1,5 @@
-import requests
-from text2speech.modules import TTS, TTSValidator
+from ovos_utils.log import LOG
+from text2speech.modules import TTS, TTSValidator, aiohttp
 
 
 class MozillaTTSServer(TTS):
@@ -10,13 +10,60 @@ class MozillaTTSServer(TTS):
         config = config or {"url": "http://0.0.0.0:5002"}
         super(MozillaTTSServer, self).__init__(config, MozillaTTSValidator(self),
                                                ssml_tags=[])
-        self.url = config['url']
+        # "url" may also be a list, or servers listed under "urls"
+        self.endpoints = self.get_endpoints(config.get("urls") or
+                                            config['url'])
+        self.url = self.endpoints.urls[0]
         self.type = 'wav'
 
     def get_tts(self, sentence, wav_file):
-        response = requests.get(self.url + "/api/tts", params={"text": sentence})
+        size = 0
         with open(wav_file, 'wb') as f:
-            f.write(response.content)
+            for data in self.stream_tts(sentence):
+                f.write(data)
+                size += len(data)
+        if not size:
+            # the error was logged by stream_tts
+            raise RuntimeError("MozillaTTS server returned no audio")
+        return (wav_file, None)  # No phonemes
+
+    def stream_tts(self, sentence, chunk_size=4096):
+        response = self.hedged_request(
+            lambda timeout: self.endpoints.request(
+                lambda url, left: self.hedged_session.get(
+                    url + "/api/tts", params={"text": sentence},
+                    timeout=left, stream=True),
+                timeout))
+        with response:
+            if response.status_code != 200:
+                LOG.error(
+                    '%s Http Error: %s for url: %s' %
+                    (response.status_code, response.reason, response.url))
+                return
+            for data in response.iter_content(chunk_size):
+                if data:
+                    yield data
+
+    async def aget_tts(self, sentence, wav_file):
+        if aiohttp is None:
+            return await super().aget_tts(sentence, wav_file)
+        session = await self.get_aiohttp_session()
+        endpoint = self.endpoints.acquire()
+        ok = False
+        try:
+            async with session.get(endpoint.url + "/api/tts",
+                                   params={"text": sentence}) as response:
+                ok = response.status < 500
+                if response.status != 200:
+                    LOG.error(
+                        '%s Http Error: %s for url: %s' %
+                        (response.status, response.reason, response.url))
+                    raise RuntimeError("MozillaTTS server returned no audio")
+                with open(wav_file, 'wb') as f:
+                    async for data in response.content.iter_chunked(4096):
+                        f.write(data)
+        finally:
+            self.endpoints.release(endpoint, ok)
         return (wav_file, None)  # No phonemes
 
 
@@ -32,8 +79,9 @@ class MozillaTTSValidator(TTSValidator):
         pass
 
     def validate_connection(self):
-        url = self.tts.config['url']
-        response = requests.get(url)
+        response = self.tts.endpoints.request(
+            lambda url: self.tts.http_session.get(url,
+                                                  timeout=self.tts.timeout))
         if not response.status_code == 200:
             raise ConnectionRefusedError
 
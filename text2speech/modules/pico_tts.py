@@ -1,6 +1,7 @@
 import subprocess
 
 from text2speech.modules import TTS, TTSValidator
+from text2speech.util import run_subprocess
 
 
 class PicoTTS(TTS):
@@ -28,6 +29,11 @@ class PicoTTS(TTS):
 
         return wav_file, None
 
+    async def aget_tts(self, sentence, wav_file):
+        await run_subprocess(
+            ['pico2wave', '-l', self.voice, "-w", wav_file, sentence])
+        return wav_file, None
+
     def describe_voices(self):
         voices = {}
         for lang_code in ['de-DE', 'en-GB', 'en-US', 'es-ES', 'fr-FR',
@@ -35,23 +35,32 @@ class PollyTTS(TTS):
                      self.describe_voices()[self.lang][0]
         self._voices = None
 
-    def get_tts(self, sentence, wav_file):
+    def _synthesize(self, sentence):
         text_type = "text"
         if self.remove_ssml(sentence) != sentence:
             text_type = "ssml"
             sentence = sentence.replace("\whispered", "/amazon:effect") \
                 .replace("\\whispered", "/amazon:effect") \
                 .replace("whispered", "amazon:effect name=\"whispered\"")
-        response = self.polly.synthesize_speech(
+        return self.polly.synthesize_speech(
             OutputFormat=self.audio_ext,
             Text=sentence,
             TextType=text_type,
             VoiceId=self.voice)
 
+    def get_tts(self, sentence, wav_file):
+        response = self._synthesize(sentence)
         with open(wav_file, 'wb') as f:
             f.write(response['AudioStream'].read())
         return (wav_file, None)  # No phonemes
 
+    def stream_tts(self, sentence, chunk_size=4096):
+        stream = self._synthesize(sentence)['AudioStream']
+        try:
+            yield from stream.iter_chunks(chunk_size)
+        finally:
+            stream.close()
+
     def describe_voices(self):
         voices = {}
         for v in self.polly.describe_voices()["Voices"]:
@@ -1,4 +1,3 @@
-import requests
 from ovos_utils.log import LOG
 from text2speech.modules import TTS, TTSValidator
 from responsive_voice import ResponsiveVoice
@@ -16,7 +15,6 @@ class ResponsiveVoiceTTS(TTS):
                             "vol": 1}
         super().__init__(config, validator=ResponsiveVoiceValidator(self),
                          ssml_tags=[])
-        self.clear_cache()
         self.pitch = config.get("pitch", 0.5)
         self.rate = config.get("rate", 0.5)
         self.vol = config.get("vol", 1)
@@ -57,7 +55,8 @@ class ResponsiveVoiceValidator(TTSValidator):
             super().validate_voice()
 
     def validate_connection(self):
-        r = requests.get("https://responsivevoice.org")
+        r = self.tts.http_session.get("https://responsivevoice.org",
+                                      timeout=self.tts.timeout)
         if r.status_code == 200:
             return True
         LOG.warning("Could not reach https://responsivevoice.org")
@@ -1,5 +1,4 @@
 from text2speech.modules import TTS, TTSValidator
-import requests
 
 
 class VoiceRSSTTS(TTS):
@@ -14,9 +13,9 @@ class VoiceRSSTTS(TTS):
         if not self.voice:
             self.voice = self.describe_voices()[self.lang][0]
 
-    def __speech(self, settings):
+    def __speech(self, settings, chunk_size=4096):
         self.__validate(settings)
-        return self.__request(settings)
+        return self.__request(settings, chunk_size)
 
     def __validate(self, settings):
         if not settings: raise RuntimeError('The settings are undefined')
@@ -27,25 +26,27 @@ class VoiceRSSTTS(TTS):
         if 'hl' not in settings or not settings['hl']: raise RuntimeError(
             'The language is undefined')
 
-    def __request(self, settings):
-        result = {'error': None, 'response': None}
-
+    def __request(self, settings, chunk_size=4096):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
         params = self.__buildRequest(settings)
         url = "https://api.voicerss.org:443"
-        response = requests.post(url, '/', params=params, headers=headers)
-
-        content = response.text
-
-        if response.status_code != 200:
-            result['error'] = response.reason
-        elif content.find('ERROR') == 0:
-            result['error'] = content
-        else:
-            result['response'] = content
-            return bytes(response.content)
-        return result
+        # billed per request, never sent twice
+        response = self.hedged_request(
+            lambda timeout: self.hedged_session.post(
+                url, '/', params=params, headers=headers, timeout=timeout,
+                stream=True), idempotent=False)
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(response.reason)
+            blocks = response.iter_content(chunk_size)
+            first = next(blocks, b"")
+            # errors are reported as text in a 200 response
+            if first.startswith(b"ERROR"):
+                raise RuntimeError(
+                    (first + b"".join(blocks)).decode("utf-8", "ignore"))
+            yield first
+            yield from blocks
 
     def __buildRequest(self, settings):
         params = {'key': '', 'src': '', 'hl': '', 'r': '', 'c': '', 'f': '',
@@ -63,7 +64,13 @@ class VoiceRSSTTS(TTS):
         return params
 
     def get_tts(self, sentence, wav_file):
-        bin_data = self.__speech({
+        with open(wav_file, "wb") as f:
+            for data in self.stream_tts(sentence):
+                f.write(data)
+        return wav_file, None
+
+    def stream_tts(self, sentence, chunk_size=4096):
+        return self.__speech({
             'key': self.key,
             'hl': self.lang,
             'src': sentence,
@@ -72,10 +79,7 @@ class VoiceRSSTTS(TTS):
             'f': '44khz_16bit_stereo',
             'ssml': 'false',
             'b64': 'false'
-        })
-        with open(wav_file, "wb") as f:
-            f.write(bin_data)
-        return wav_file, None
+        }, chunk_size)
 
     def describe_voices(self):
         voices = {"ca-es": ["Catalan"],
@@ -0,0 +1,130 @@
+"""Batch synthesize known phrases into the TTS cache.
+
+Usage:
+    text2speech-prewarm --config tts.json --workers 4 dialogs/*.dialog
+
+Every phrase goes through the same preprocessing and cache key derivation
+as TTS._execute, so anything prewarmed is a cache hit when spoken.
+Finished chunks are committed to the cache index as they complete, an
+interrupted run can simply be restarted and resumes where it stopped.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ovos_utils.log import LOG
+
+
+class PrewarmReport(namedtuple("PrewarmReport",
+                               ["total", "cached", "synthesized", "failed",
+                                "elapsed"])):
+    @property
+    def throughput(self):
+        """Synthesized chunks per second."""
+        if not self.elapsed:
+            return 0.0
+        return self.synthesized / self.elapsed
+
+    def __str__(self):
+        return "{} chunks: {} already cached, {} synthesized, {} failed " \
+               "in {:.2f}s ({:.2f} chunks/s)".format(
+                self.total, self.cached, self.synthesized, self.failed,
+                self.elapsed, self.throughput)
+
+
+def prewarm(phrases, engine_config=None, workers=4, tts=None):
+    """Synthesize phrases that are not cached yet.
+
+    Args:
+        phrases (iterable): sentences to cache
+        engine_config (dict): TTSFactory config used to create the engine
+        workers (int): number of chunks synthesized in parallel
+        tts (TTS): engine to use instead of creating one from engine_config
+
+    Returns:
+        PrewarmReport: counts and timing of the run
+    """
+    if tts is None:
+        from text2speech import TTSFactory
+        tts = TTSFactory.create(engine_config)
+
+    start = time.time()
+    chunks = []
+    seen = set()
+    for phrase in phrases:
+        for chunk in tts.preprocess(phrase):
+            key = tts.get_cache_key(chunk)
+            if key not in seen:
+                seen.add(key)
+                chunks.append((key, chunk))
+    pending = [chunk for key, chunk in chunks if key not in tts.cache]
+
+    synthesized = failed = 0
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(tts.synthesize, chunk): chunk
+                   for chunk in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                synthesized += 1
+            except Exception:
+                LOG.exception("Failed to prewarm: " + futures[future])
+                failed += 1
+    finally:
+        # on interruption drop queued chunks, the next run picks them up
+        pool.shutdown(wait=True, cancel_futures=True)
+        tts.cache.flush()
+
+    return PrewarmReport(len(chunks), len(chunks) - len(pending),
+                         synthesized, failed, time.time() - start)
+
+
+def read_phrases(paths):
+    """Read phrases, one per line, from text or .dialog files.
+
+    Args:
+        paths (list): files to read, "-" reads stdin
+
+    Returns:
+        list: phrases
+    """
+    phrases = []
+    for path in paths:
+        if path == "-":
+            lines = sys.stdin.read().split("\n")
+        else:
+            with open(path) as f:
+                lines = f.read().split("\n")
+        phrases += [l.strip() for l in lines
+                    if l.strip() and not l.strip().startswith("#")]
+    return phrases
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Synthesize phrases into the TTS cache")
+    parser.add_argument("files", nargs="+",
+                        help="phrase files, one phrase per line, - for stdin")
+    parser.add_argument("-c", "--config", required=True,
+                        help="json file with the TTSFactory engine config")
+    parser.add_argument("-w", "--workers", type=int, default=4,
+                        help="parallel synthesis workers")
+    args = parser.parse_args(args)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    try:
+        report = prewarm(read_phrases(args.files), config, args.workers)
+    except KeyboardInterrupt:
+        print("interrupted, run again to resume")
+        return 1
+    print(report)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""Client side rate limiting of metered cloud engines.
+
+Requests beyond the configured rates wait in a priority queue instead of
+being sent and throttled by the provider. Rates are enforced with token
+buckets, one for requests and one for characters, and the number of
+requests in flight can be capped. All timing goes through an injectable
+clock.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from threading import Condition
+
+# longest single wait, so a waiter rechecks the clock and its deadline
+MAX_WAIT = 0.5
+
+
+class QueueTimeout(TimeoutError):
+    """A request waited in the rate limit queue past its deadline."""
+
+
+class TokenBucket:
+    """Tokens refilled at a constant rate up to a capacity.
+
+    Args:
+        rate (float): tokens added per second
+        capacity (float): maximum tokens, the allowed burst
+        clock (callable): returns the current time in seconds
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Return seconds until amount tokens can be taken, 0 if now.
+
+        Amounts above the capacity are allowed once the bucket is full,
+        the deficit then delays the following requests.
+        """
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+
+class Ticket:
+    """A request waiting in, or admitted by, a RateLimiter."""
+    __slots__ = ("chars", "priority", "deadline", "enqueued", "admitted",
+                 "cancelled", "released")
+
+    def __init__(self, chars, priority, deadline, enqueued):
+        self.chars = chars
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued = enqueued
+        self.admitted = None
+        self.cancelled = False
+        self.released = False
+
+
+class RateLimiter:
+    """Admit requests to an engine within request, character and
+    concurrency limits.
+
+    Requests are admitted in priority order, higher first, and in arrival
+    order within a priority. A request that can not be admitted before its
+    deadline raises QueueTimeout.
+
+    Args:
+        requests_per_second (float): request rate, unlimited if None
+        chars_per_second (float): rate of synthesized characters,
+                                  unlimited if None
+        max_concurrent (int): requests in flight, unlimited if None
+        burst (float): requests allowed at once, defaults to one second
+                       worth of requests
+        timeout (float): default seconds a request may wait, None waits
+                         forever
+        clock (callable): returns the current time in seconds
+    """
+
+    def __init__(self, requests_per_second=None, chars_per_second=None,
+                 max_concurrent=None, burst=None, timeout=None,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_second, burst, clock) \
+            if requests_per_second else None
+        self.chars = TokenBucket(chars_per_second, None, clock) \
+            if chars_per_second else None
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.in_flight = 0
+        self.condition = Condition()
+        # wake up asynchronous waiters, see aacquire
+        self._listeners = set()
+        self._queue = []
+        self._order = itertools.count()
+        # counters exposed by stats
+        self.admitted = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+
+    @classmethod
+    def from_config(cls, config, clock=time.monotonic):
+        """Build a limiter from the "rate_limit" section of an engine config.
+
+        Args:
+            config (dict): requests_per_second, chars_per_second,
+                           max_concurrent, burst and timeout
+
+        Returns:
+            RateLimiter: the limiter, None if config is empty
+        """
+        if not config:
+            return None
+        return cls(config.get("requests_per_second"),
+                   config.get("chars_per_second"),
+                   config.get("max_concurrent"),
+                   config.get("burst"),
+                   config.get("timeout"),
+                   clock)
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting to be admitted."""
+        return sum(1 for _, _, ticket in self._queue if not ticket.cancelled)
+
+    def enqueue(self, chars=0, priority=0, timeout=None):
+        """Queue a request without waiting for its admission.
+
+        Args:
+            chars (int): characters the request synthesizes
+            priority (int): higher priorities are admitted first
+            timeout (float): seconds the request may wait, defaults to the
+                             limiter timeout
+
+        Returns:
+            Ticket: the queued request, pass it to poll
+        """
+        timeout = self.timeout if timeout is None else timeout
+        now = self.clock()
+        deadline = None if timeout is None else now + timeout
+        ticket = Ticket(chars, priority, deadline, now)
+        with self.condition:
+            heapq.heappush(self._queue,
+                           (-priority, next(self._order), ticket))
+            self.max_queue_depth = max(self.max_queue_depth,
+                                       self.queue_depth)
+        return ticket
+
+    def poll(self, ticket):
+        """Try to admit a queued request.
+
+        Args:
+            ticket (Ticket): request returned by enqueue
+
+        Returns:
+            float: 0 if the request was admitted, otherwise the seconds to
+                   wait before polling again
+
+        Raises:
+            QueueTimeout: the deadline of the request passed
+        """
+        with self.condition:
+            return self._poll(ticket)
+
+    def _poll(self, ticket):
+        if ticket.admitted is not None:
+            return 0.0
+        if ticket.cancelled:
+            raise QueueTimeout("request was removed from the queue")
+        self._drop_cancelled()
+        now = self.clock()
+        if self._queue[0][2] is ticket:
+            wait = self._admission_wait(ticket)
+            if wait == 0:
+                heapq.heappop(self._queue)
+                self._admit(ticket, now)
+                # the next request may be admissible as well
+                self._notify()
+                return 0.0
+        else:
+            # wait for the requests ahead, they notify when admitted
+            wait = MAX_WAIT
+        if ticket.deadline is not None:
+            if now >= ticket.deadline:
+                self._cancel(ticket)
+                self.timed_out += 1
+                raise QueueTimeout("rate limit queue deadline exceeded")
+            wait = min(wait, ticket.deadline - now)
+        return min(wait, MAX_WAIT)
+
+    def _admission_wait(self, ticket):
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            # released requests notify
+            return MAX_WAIT
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.chars is not None and ticket.chars:
+            wait = max(wait, self.chars.wait_time(ticket.chars))
+        return wait
+
+    def _admit(self, ticket, now):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.chars is not None and ticket.chars:
+            self.chars.take(ticket.chars)
+        self.in_flight += 1
+        self.admitted += 1
+        self.total_wait += now - ticket.enqueued
+        ticket.admitted = now
+
+    def _cancel(self, ticket):
+        ticket.cancelled = True
+        self._drop_cancelled()
+        self._notify()
+
+    def _drop_cancelled(self):
+        while self._queue and self._queue[0][2].cancelled:
+            heapq.heappop(self._queue)
+
+    def cancel(self, ticket):
+        """Remove a request from the queue, or release it if admitted."""
+        with self.condition:
+            if ticket.admitted is not None:
+                self._release(ticket)
+            elif not ticket.cancelled:
+                self._cancel(ticket)
+
+    def acquire(self, chars=0, priority=0, timeout=None):
+        """Wait until a request is admitted.
+
+        Args:
+            chars (int): characters the request synthesizes
+            priority (int): higher priorities are admitted first
+            timeout (float): seconds the request may wait, defaults to the
+                             limiter timeout
+
+        Returns:
+            Ticket: the admitted request, release it once done
+
+        Raises:
+            QueueTimeout: the request was not admitted in time
+        """
+        ticket = self.enqueue(chars, priority, timeout)
+        with self.condition:
+            try:
+                wait = self._poll(ticket)
+                while wait:
+                    self.condition.wait(wait)
+                    wait = self._poll(ticket)
+            except BaseException:
+                if not ticket.cancelled:
+                    self.cancel(ticket)
+                raise
+        return ticket
+
+    async def aacquire(self, chars=0, priority=0, timeout=None):
+        """Asynchronous acquire, waiting on the running event loop.
+
+        No thread is held while the request is queued.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        def listener():
+            loop.call_soon_threadsafe(wakeup.set)
+
+        ticket = self.enqueue(chars, priority, timeout)
+        with self.condition:
+            self._listeners.add(listener)
+        try:
+            while True:
+                wakeup.clear()
+                wait = self.poll(ticket)
+                if not wait:
+                    return ticket
+                try:
+                    await asyncio.wait_for(wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self.cancel(ticket)
+            raise
+        finally:
+            with self.condition:
+                self._listeners.discard(listener)
+
+    def _notify(self):
+        self.condition.notify_all()
+        for listener in self._listeners:
+            listener()
+
+    def release(self, ticket):
+        """Mark an admitted request as finished."""
+        with self.condition:
+            self._release(ticket)
+
+    def _release(self, ticket):
+        if ticket.admitted is None or ticket.released:
+            return
+        ticket.released = True
+        self.in_flight -= 1
+        self._notify()
+
+    def limit(self, chars=0, priority=0, timeout=None):
+        """Context manager holding an admitted request, see acquire."""
+        return _Admission(self, chars, priority, timeout)
+
+    def stats(self):
+        """Return queue depth and admission counters."""
+        with self.condition:
+            return {"queue_depth": self.queue_depth,
+                    "max_queue_depth": self.max_queue_depth,
+                    "in_flight": self.in_flight,
+                    "admitted": self.admitted,
+                    "timed_out": self.timed_out,
+                    "total_wait": self.total_wait}
+
+
+class _Admission:
+    __slots__ = ("limiter", "args", "ticket")
+
+    def __init__(self, limiter, *args):
+        self.limiter = limiter
+        self.args = args
+        self.ticket = None
+
+    def __enter__(self):
+        self.ticket = self.limiter.acquire(*self.args)
+        return self.ticket
+
+    def __exit__(self, *args):
+        self.limiter.release(self.ticket)
@@ -0,0 +1,157 @@
+"""Run sox over pipes.
+
+Audio is fed to sox on stdin and the processed audio is read back from
+stdout, so conversions and effects need no intermediate files. Several
+inputs, a format conversion and any number of effects are fused into a
+single sox process.
+"""
+import struct
+import subprocess
+
+from ovos_utils.log import LOG
+
+
+def fix_wav_header(data):
+    """Patch the sizes of a wav file written to a pipe.
+
+    sox can not seek back to update the header when writing to stdout, the
+    RIFF and data chunk sizes are set here from the actual length.
+
+    Args:
+        data (bytes): wav file contents
+
+    Returns:
+        bytes: wav file contents with correct chunk sizes
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return data
+    data = bytearray(data)
+    struct.pack_into("<I", data, 4, len(data) - 8)
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = bytes(data[offset:offset + 4])
+        size = struct.unpack_from("<I", data, offset + 4)[0]
+        if chunk_id == b"data":
+            struct.pack_into("<I", data, offset + 4, len(data) - offset - 8)
+            break
+        offset += 8 + size + (size & 1)
+    return bytes(data)
+
+
+class SoxCommand:
+    """Builder for a single sox invocation.
+
+    Args:
+        output_type (str): output format, e.g. "wav"
+        channels (int): output channels, unchanged if None
+        rate (int): output sample rate, unchanged if None
+        bits (int): output bits per sample, unchanged if None
+    """
+
+    def __init__(self, output_type="wav", channels=None, rate=None,
+                 bits=None):
+        self.output_type = output_type
+        self.channels = channels
+        self.rate = rate
+        self.bits = bits
+        self.inputs = []
+        self.effects = []
+        self._piped = False
+
+    def add_input(self, path, file_type=None, channels=None, rate=None):
+        """Add an input file, inputs are concatenated in order.
+
+        Args:
+            path (str): input file, "-" reads stdin
+            file_type (str): input format, required for stdin
+            channels (int): override the channels of headerless input
+            rate (int): override the sample rate of headerless input
+
+        Returns:
+            SoxCommand: self, to chain calls
+        """
+        if path == "-":
+            if self._piped:
+                raise ValueError("sox reads a single input from stdin")
+            if not file_type:
+                raise ValueError("piped input needs a file_type")
+            self._piped = True
+        args = []
+        if file_type:
+            args += ["-t", file_type]
+        if channels:
+            args += ["-c", str(channels)]
+        if rate:
+            args += ["-r", str(rate)]
+        self.inputs.append(args + [path])
+        return self
+
+    def add_effects(self, *args):
+        """Append sox effect arguments, e.g. add_effects("gain", "-3").
+
+        Returns:
+            SoxCommand: self, to chain calls
+        """
+        self.effects += [str(arg) for arg in args]
+        return self
+
+    def command(self, out_path="-"):
+        """Return the sox command line writing to out_path."""
+        cmd = ["sox"]
+        for args in self.inputs:
+            cmd += args
+        if out_path == "-":
+            cmd += ["-t", self.output_type]
+        # the output format is also set on the output file, so sox converts
+        # back if an effect like speed changes it again
+        conversion = []
+        if self.channels:
+            cmd += ["-c", str(self.channels)]
+            conversion += ["channels", str(self.channels)]
+        if self.rate:
+            cmd += ["-r", str(self.rate)]
+            conversion += ["rate", str(self.rate)]
+        if self.bits:
+            cmd += ["-b", str(self.bits)]
+        cmd.append(out_path)
+        # convert first, so effects run on the output format
+        return cmd + conversion + self.effects
+
+    def run(self, data=None):
+        """Execute sox and return the output audio.
+
+        Args:
+            data (bytes): audio fed to stdin, for an input added as "-"
+
+        Returns:
+            bytes: output audio
+
+        Raises:
+            subprocess.CalledProcessError: sox failed
+        """
+        cmd = self.command()
+        proc = subprocess.run(cmd, input=data, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, check=True)
+        if proc.stderr:
+            LOG.debug(proc.stderr.decode("utf-8", "ignore"))
+        if self.output_type == "wav":
+            return fix_wav_header(proc.stdout)
+        return proc.stdout
+
+    def run_to_file(self, out_path, data=None):
+        """Execute sox writing the output audio to a file.
+
+        Args:
+            out_path (str): output file
+            data (bytes): audio fed to stdin, for an input added as "-"
+
+        Returns:
+            str: out_path
+
+        Raises:
+            subprocess.CalledProcessError: sox failed
+        """
+        subprocess.run(self.command(out_path), input=data,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                       check=True)
+        return out_path
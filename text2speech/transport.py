@@ -0,0 +1,417 @@
+"""HTTP transport shared by the remote engines.
+
+Engines get their requests session from here instead of opening a new
+connection per request. Sessions with the same pool and retry settings are
+shared process wide, connections to a host are kept alive and reused, so
+repeated requests skip the TCP and TLS handshakes.
+"""
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# seconds to wait for the server, overridable per engine with "timeout"
+DEFAULT_TIMEOUT = 10
+# connections kept alive per host
+DEFAULT_POOL_SIZE = 10
+# attempts after a connection error or a retryable status
+DEFAULT_RETRIES = 2
+# retries wait backoff * 2 ** (attempt - 1) seconds
+DEFAULT_BACKOFF = 0.2
+# 429 is left to the caller and the rate limiter
+RETRY_STATUS = (500, 502, 503, 504)
+# consecutive failures opening an endpoint's circuit
+DEFAULT_FAILURE_THRESHOLD = 3
+# seconds an open circuit waits before letting a probe request through
+DEFAULT_RESET_TIMEOUT = 30
+# latency percentile after which a duplicate request is sent
+DEFAULT_HEDGE_PERCENTILE = 95
+# adaptive deadlines are this multiple of the p99 latency ...
+DEADLINE_FACTOR = 3
+# ... but never shorter than this many seconds
+MIN_DEADLINE = 1.0
+
+_sessions = {}
+_lock = Lock()
+_hedge_executor = None
+
+
+def build_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                  backoff=DEFAULT_BACKOFF, hedged=False):
+    """Create a requests session with connection pooling and retries.
+
+    Args:
+        pool_size (int): connections kept alive per host
+        retries (int): retries of failed requests
+        backoff (float): backoff factor between retries, in seconds
+        hedged (bool): only retry connection errors, slow and failed
+                       responses are left to the hedging and deadline of
+                       TTS.hedged_request
+
+    Returns:
+        requests.Session: the session
+    """
+    # False raises the read timeout itself instead of a retry error
+    retry = Retry(total=retries, connect=retries,
+                  read=False if hedged else retries,
+                  status=0 if hedged else retries, backoff_factor=backoff,
+                  status_forcelist=RETRY_STATUS,
+                  # a POST may be billed, it is only retried after a
+                  # connection error, when it was never sent
+                  allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                backoff=DEFAULT_BACKOFF, hedged=False):
+    """Return the shared session for a pool and retry configuration.
+
+    Args:
+        pool_size (int): connections kept alive per host
+        retries (int): retries of failed requests
+        backoff (float): backoff factor between retries, in seconds
+        hedged (bool): session for hedged requests, see build_session
+
+    Returns:
+        requests.Session: shared session
+    """
+    key = (pool_size, retries, backoff, hedged)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = build_session(pool_size, retries,
+                                                     backoff, hedged)
+        return session
+
+
+def close_sessions():
+    """Close all shared sessions and their pooled connections."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+class CircuitBreaker:
+    """Track the health of an endpoint.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests are refused. Once ``reset_timeout`` seconds passed a single
+    probe request is let through, its success closes the circuit again,
+    its failure keeps it open for another ``reset_timeout``.
+
+    Args:
+        failure_threshold (int): consecutive failures opening the circuit
+        reset_timeout (float): seconds before an open circuit is probed
+        clock (callable): returns the current time in seconds
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def probe_due(self):
+        """True if the circuit is open and its reset timeout expired."""
+        return self.state == self.OPEN and \
+            self.clock() - self.opened_at >= self.reset_timeout
+
+    def allow(self):
+        """Return True if a request may be sent, claiming the probe slot of
+        an open circuit whose reset timeout expired."""
+        if self.state == self.CLOSED:
+            return True
+        if self.probe_due:
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or \
+                self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+
+class Endpoint:
+    """A server of a remote engine.
+
+    Args:
+        url (str): base url
+        breaker (CircuitBreaker): health of the server
+    """
+
+    def __init__(self, url, breaker):
+        self.url = url
+        self.breaker = breaker
+        self.outstanding = 0
+
+    def __repr__(self):
+        return "Endpoint({}, {}, outstanding={})".format(
+            self.url, self.breaker.state, self.outstanding)
+
+
+class EndpointPool:
+    """Balance requests over the servers of a remote engine.
+
+    Each request goes to the healthy endpoint with the least outstanding
+    requests. Endpoints failing repeatedly are taken out of rotation by
+    their circuit breaker and re-admitted after a successful probe.
+
+    Args:
+        urls (list): base urls of the servers
+        failure_threshold (int): consecutive failures opening a circuit
+        reset_timeout (float): seconds before an open circuit is probed
+        clock (callable): returns the current time in seconds
+    """
+
+    def __init__(self, urls, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.monotonic):
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls:
+            raise ValueError("at least one endpoint url is required")
+        self.lock = Lock()
+        self.endpoints = [
+            Endpoint(url, CircuitBreaker(failure_threshold, reset_timeout,
+                                         clock))
+            for url in urls]
+        self._next = 0
+
+    @property
+    def urls(self):
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def acquire(self, exclude=()):
+        """Pick the endpoint for a request and count it as outstanding.
+
+        If every circuit is open the endpoint that failed longest ago is
+        used anyway, a request failing is better than none being sent.
+
+        Args:
+            exclude (iterable): endpoints not to pick, e.g. ones that
+                                already failed this request
+
+        Returns:
+            Endpoint: endpoint to send the request to, release it after
+        """
+        with self.lock:
+            candidates = [e for e in self.endpoints if e not in exclude] \
+                or self.endpoints
+            # rotate the start so ties are spread over the endpoints
+            start = self._next % len(candidates)
+            self._next += 1
+            candidates = candidates[start:] + candidates[:start]
+            # a due probe goes first, so a recovered server is re-admitted
+            # even while the others keep up with the load
+            probes = [e for e in candidates if e.breaker.probe_due]
+            healthy = [e for e in candidates
+                       if e.breaker.state == CircuitBreaker.CLOSED]
+            if probes:
+                endpoint = probes[0]
+            elif healthy:
+                endpoint = min(healthy, key=lambda e: e.outstanding)
+            else:
+                endpoint = min(candidates,
+                               key=lambda e: e.breaker.opened_at or 0)
+            endpoint.breaker.allow()
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint, ok=True):
+        """Record the outcome of a request sent to endpoint.
+
+        Args:
+            endpoint (Endpoint): endpoint returned by acquire
+            ok (bool): False if the server failed or could not be reached
+        """
+        with self.lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.breaker.record_success()
+            else:
+                endpoint.breaker.record_failure()
+
+    def request(self, send, timeout=None):
+        """Send a request, failing over to other endpoints on errors.
+
+        Args:
+            send (callable): send(base_url) performing the request and
+                             returning a requests.Response, with a timeout
+                             send(base_url, timeout) given the seconds left
+            timeout (float): seconds for the request, failovers included,
+                             no other endpoint is tried once they ran out
+
+        Returns:
+            requests.Response: the first response that is not a server
+                               error, or the last one received
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        tried = []
+        while True:
+            endpoint = self.acquire(exclude=tried)
+            tried.append(endpoint)
+            try:
+                if deadline is None:
+                    response = send(endpoint.url)
+                else:
+                    response = send(endpoint.url,
+                                    deadline - time.monotonic())
+            except requests.RequestException:
+                self.release(endpoint, ok=False)
+                if self._last_try(tried, deadline):
+                    raise
+                continue
+            ok = response.status_code < 500
+            self.release(endpoint, ok)
+            if ok or self._last_try(tried, deadline):
+                return response
+            response.close()
+
+    def _last_try(self, tried, deadline):
+        return len(tried) >= len(self.endpoints) or \
+            (deadline is not None and time.monotonic() >= deadline)
+
+
+class LatencyTracker:
+    """Sliding window of request latencies of an engine.
+
+    Args:
+        window (int): number of recent latencies kept
+        min_samples (int): latencies needed before percentiles are trusted
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self.lock = Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        with self.lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q):
+        """Return the q-th percentile latency in seconds.
+
+        Args:
+            q (float): percentile, between 0 and 100
+
+        Returns:
+            float: latency, None until min_samples were recorded
+        """
+        with self.lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+    def deadline(self, timeout):
+        """Return the timeout to use for the next request.
+
+        Args:
+            timeout (float): configured timeout, used until enough latencies
+                             were recorded and as an upper bound after
+
+        Returns:
+            float: timeout in seconds
+        """
+        p99 = self.percentile(99)
+        if p99 is None:
+            return timeout
+        return min(timeout, max(MIN_DEADLINE, p99 * DEADLINE_FACTOR))
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=32, thread_name_prefix="tts-hedge")
+        return _hedge_executor
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def hedge(send, delay, deadline=None):
+    """Send a request, sending a duplicate if it is slow to answer.
+
+    If the first request has not answered after delay seconds a second one
+    is sent, the first response received is returned and the other one is
+    closed when it arrives.
+
+    Args:
+        send (callable): send() performing the request and returning a
+                         requests.Response
+        delay (float): seconds before the duplicate is sent, None sends
+                       a single request
+        deadline (float): time.monotonic() time by which a hedged request
+                          must have answered, None waits for the requests
+
+    Returns:
+        requests.Response: first response received
+
+    Raises:
+        requests.Timeout: no response arrived before the deadline
+    """
+    if delay is None:
+        return send()
+    executor = _get_hedge_executor()
+    pending = {executor.submit(send)}
+    done, pending = wait(pending, timeout=_remaining(delay, deadline))
+    if not done and _remaining(None, deadline) != 0:
+        pending.add(executor.submit(send))
+    error = None
+    while pending or done:
+        if not done:
+            done, pending = wait(pending, _remaining(None, deadline),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                # late responses are closed when they arrive
+                for other in pending:
+                    other.add_done_callback(_close_response)
+                raise requests.Timeout("no response before the deadline")
+        future = done.pop()
+        if future.exception() is None:
+            for other in done | pending:
+                other.add_done_callback(_close_response)
+            return future.result()
+        error = future.exception()
+    raise error
+
+
+def _remaining(timeout, deadline):
+    """Return timeout capped by the seconds left until deadline."""
+    if deadline is None:
+        return timeout
+    left = max(deadline - time.monotonic(), 0)
+    return left if timeout is None else min(timeout, left)
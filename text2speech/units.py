@@ -0,0 +1,214 @@
+"""In-memory inventory of the audio units used by concatenative voices.
+
+Every unit is decoded once and converted to the voice's sample rate and
+channel count, an utterance is then assembled by joining PCM buffers
+without touching the disk or spawning sox.
+"""
+import io
+import os
+import re
+import wave
+from functools import lru_cache
+from threading import Lock
+
+from ovos_utils.log import LOG
+from text2speech import dsp
+from text2speech.sox import SoxCommand
+
+
+def unit_text(path):
+    """Return the text spoken by a unit, taken from its file name.
+
+    "_" and "-" separate words, e.g. "good_morning.wav" is "good morning".
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name.replace("_", " ").replace("-", " ")
+
+
+class UnitInventory:
+    """PCM audio of concatenation units, keyed by file path.
+
+    Args:
+        directory (str): directory whose units are loaded up front, units
+                         outside of it are loaded when first requested
+        rate (int): sample rate of the assembled audio
+        channels (int): channels of the assembled audio
+        width (int): sample width in bytes of the assembled audio
+    """
+    EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac")
+
+    def __init__(self, directory=None, rate=16000, channels=1, width=2):
+        self.directory = directory
+        self.rate = int(rate)
+        self.channels = int(channels)
+        self.width = width
+        self.frame_size = self.channels * self.width
+        self.lock = Lock()
+        self._units = {}
+        if directory and os.path.isdir(directory):
+            self.load(directory)
+
+    def load(self, directory):
+        """Load every unit found under directory.
+
+        Returns:
+            int: number of units loaded
+        """
+        count = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith(self.EXTENSIONS):
+                    if self.get(os.path.join(root, name)) is not None:
+                        count += 1
+        LOG.debug("loaded {} units from {}".format(count, directory))
+        return count
+
+    def get(self, path):
+        """Return the PCM frames of a unit, loading it if needed.
+
+        Args:
+            path (str): unit file
+
+        Returns:
+            bytes: PCM frames in the inventory format, None if the unit
+                   does not exist or can not be decoded
+        """
+        pcm = self._units.get(path)
+        if pcm is None:
+            pcm = self._decode(path)
+            if pcm is not None:
+                with self.lock:
+                    self._units[path] = pcm
+        return pcm
+
+    def _decode(self, path):
+        if not os.path.isfile(path):
+            return None
+        try:
+            if path.lower().endswith(".wav"):
+                with wave.open(path, "rb") as f:
+                    if f.getframerate() == self.rate and \
+                            f.getnchannels() == self.channels and \
+                            f.getsampwidth() == self.width:
+                        return f.readframes(f.getnframes())
+                if dsp.np is not None:
+                    samples, rate, _ = dsp.read_wav(path)
+                    samples = dsp.convert(samples, rate, self.rate,
+                                          self.channels)
+                    return dsp.encode_pcm(samples, self.width)
+            # other formats and conversions without numpy go through sox,
+            # once per unit
+            audio = SoxCommand("wav", channels=self.channels, rate=self.rate,
+                               bits=8 * self.width).add_input(path).run()
+            with wave.open(io.BytesIO(audio), "rb") as f:
+                return f.readframes(f.getnframes())
+        except Exception:
+            LOG.exception("Failed to load unit: " + path)
+            return None
+
+    def silence(self, seconds):
+        """Return PCM frames of silence."""
+        # 8 bit wav samples are unsigned
+        zero = b"\x80" if self.width == 1 else b"\x00"
+        return zero * (int(seconds * self.rate) * self.frame_size)
+
+    def concat(self, paths, gap=0.0):
+        """Assemble units into a wav file.
+
+        Args:
+            paths (list): unit files, missing units are skipped
+            gap (float): seconds of silence inserted between units
+
+        Returns:
+            bytes: wav file contents
+        """
+        units = [pcm for pcm in map(self.get, paths) if pcm is not None]
+        out = io.BytesIO()
+        with wave.open(out, "wb") as f:
+            f.setnchannels(self.channels)
+            f.setsampwidth(self.width)
+            f.setframerate(self.rate)
+            f.writeframes(self.silence(gap).join(units))
+        return out.getvalue()
+
+    def __contains__(self, path):
+        return path in self._units
+
+    def __iter__(self):
+        return iter(list(self._units))
+
+    def __len__(self):
+        return len(self._units)
+
+
+class UnitIndex:
+    """Trie over unit texts selecting units by greedy longest match.
+
+    Each unit covers a sequence of words, a sentence is covered from left
+    to right by the unit matching the most words at that position. Words
+    no unit starts with are skipped. Lookups cost O(sentence length) no
+    matter the inventory size, and results for repeated sentences are
+    memoized.
+
+    Args:
+        units (dict): unit text -> unit file
+        memo_size (int): number of sentences whose selection is memoized
+    """
+    WORD = re.compile(r"[\w']+")
+    # trie key holding the unit file of the words leading to a node
+    _UNIT = ""
+
+    def __init__(self, units=None, memo_size=1024):
+        self._trie = {}
+        self._memo = lru_cache(maxsize=memo_size)(self._select)
+        for text, path in (units or {}).items():
+            self.add(text, path)
+
+    @classmethod
+    def tokenize(cls, text):
+        return cls.WORD.findall(text.lower())
+
+    def add(self, text, path):
+        """Add a unit, replacing any unit with the same words."""
+        words = self.tokenize(text)
+        if not words:
+            return
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        node[self._UNIT] = path
+        self._memo.cache_clear()
+
+    def _select(self, sentence):
+        words = self.tokenize(sentence)
+        files = []
+        spoken = []
+        i = 0
+        while i < len(words):
+            node = self._trie
+            match = None
+            for j in range(i, len(words)):
+                node = node.get(words[j])
+                if node is None:
+                    break
+                if self._UNIT in node:
+                    match = (j + 1, node[self._UNIT])
+            if match is None:
+                i += 1
+                continue
+            end, path = match
+            files.append(path)
+            spoken += words[i:end]
+            i = end
+        return tuple(files), " ".join(spoken)
+
+    def select(self, sentence):
+        """Select the units speaking a sentence.
+
+        Args:
+            sentence (str): sentence to speak
+
+        Returns:
+            tuple: (tuple of unit files, text covered by the units)
+        """
+        return self._memo(sentence)
@@ -13,11 +13,13 @@
 # limitations under the License.
 #
 from os.path import join, expanduser
+import asyncio
 import os.path
 import psutil
 from stat import S_ISREG, ST_MTIME, ST_MODE, ST_SIZE
 from ovos_utils.signal import *
 import os
+import re
 
 
 def resolve_resource_file(res_name):
@@ -81,12 +83,92 @@ def resolve_resource_file(res_name):
     return None  # Resource cannot be resolved
 
 
+async def run_subprocess(args, data=None):
+    """Run a command without blocking the event loop.
+
+    Args:
+        args (list): command and arguments
+        data (bytes): optional input written to the process stdin
+
+    Returns:
+        bytes: the process stdout
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args, stdin=asyncio.subprocess.PIPE if data is not None else None,
+        stdout=asyncio.subprocess.PIPE)
+    stdout, _ = await process.communicate(data)
+    return stdout
+
+
 def remove_last_slash(url):
     if url and url.endswith('/'):
         url = url[:-1]
     return url
 
 
+class PhoneticSpellings(dict):
+    """Dictionary of word -> phonetic spelling applied in a single pass.
+
+    Lookups are case insensitive and only whole words are replaced. The
+    lowercased lookup table is built on first use and rebuilt whenever
+    the dictionary is modified.
+    """
+    WORD = re.compile(r"[\w']+")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lookup = None
+
+    def apply(self, text):
+        """Replace every word with a known phonetic spelling.
+
+        Args:
+            text (str): sentence to transform
+
+        Returns:
+            str: sentence with phonetic spellings applied
+        """
+        if not self:
+            return text
+        lookup = self._lookup
+        if lookup is None:
+            lookup = self._lookup = {k.lower(): v for k, v in self.items()}
+        return self.WORD.sub(
+            lambda m: lookup.get(m.group().lower(), m.group()), text)
+
+    def __setitem__(self, key, value):
+        self._lookup = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._lookup = None
+        super().__delitem__(key)
+
+    def clear(self):
+        self._lookup = None
+        super().clear()
+
+    def pop(self, *args):
+        self._lookup = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._lookup = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._lookup = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._lookup = None
+        super().update(*args, **kwargs)
+
+    def __ior__(self, other):
+        self._lookup = None
+        return super().__ior__(other)
+
+
 def curate_cache(directory, min_free_percent=5.0, min_free_disk=50):
     """Clear out the directory if needed
 